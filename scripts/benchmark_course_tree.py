@@ -0,0 +1,140 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+SOURCE_FOLDER = Path(__file__).resolve().parent.parent / "src" / "main" / "python"
+RESOURCES_FOLDER = SOURCE_FOLDER.parent / "resources" / "base"
+sys.path.insert(0, str(SOURCE_FOLDER))
+
+# Render without a display, unless a platform was chosen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QModelIndex
+from PyQt5.QtWidgets import QApplication
+
+from course_structure import CourseStructure
+from entities import Course
+
+LECTURES_PER_SUBSECTION = 10
+SUBSECTIONS_PER_SECTION = 10
+
+
+class ResourceContext(object):
+    """Application context which only finds the resources of the application
+    """
+
+    def get_resource(self, name):
+        return str(RESOURCES_FOLDER / name)
+
+
+def get_course(lectures):
+    """Get a course with sections of subsections of lectures
+
+    Arguments:
+        lectures {int} -- Number of lectures of the course
+    """
+    course_outline = OrderedDict()
+    for index in range(lectures):
+        section = "Section {index}".format(index=index // (LECTURES_PER_SUBSECTION * SUBSECTIONS_PER_SECTION))
+        subsection = "Subsection {index}".format(index=index // LECTURES_PER_SUBSECTION)
+        lecture_url = "https://courses.edx.org/courses/course/jump_to/block@{index}".format(index=index)
+        course_outline.setdefault(section, OrderedDict()).setdefault(subsection, OrderedDict())[lecture_url] = \
+            "Lecture {index}".format(index=index)
+    return Course(name="Course of {lectures} lectures".format(lectures=lectures), url="https://courses.edx.org",
+                  data_course_key="course", course_outline=course_outline)
+
+
+def fetch_all(model, parent=QModelIndex()):
+    """Create every row of the tree, as if the user had expanded every folder
+
+    Arguments:
+        model {CourseTreeModel} -- Model of the lecture tree
+
+    Keyword Arguments:
+        parent {QModelIndex} -- Index of the folder whose rows are created (default: {QModelIndex()})
+    """
+    if model.canFetchMore(parent):
+        model.fetchMore(parent)
+    for row in range(model.rowCount(parent)):
+        fetch_all(model, model.index(row, 0, parent))
+
+
+def time_updates(application, tree, lecture_urls, repeat):
+    """Time the status updates of the tree, including the repaint they cause.
+    Returns the median time of an update in milliseconds.
+
+    Arguments:
+        application {QApplication} -- The application, whose events are processed after each update
+        tree {CourseStructure} -- The lecture tree
+        lecture_urls {list} -- Urls of the lectures whose status is updated
+        repeat {int} -- Number of updates
+    """
+    times = []
+    for step in range(repeat):
+        status = "{percent}%".format(percent=step % 100)
+        started = time.perf_counter()
+        tree.update_lecture_status({lecture_url: status for lecture_url in lecture_urls})
+        application.processEvents()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    """Time the status updates of the lecture tree for courses of growing size, with every folder expanded.
+    Updating a fixed number of lectures should cost the same whatever the size of the course,
+    so the check fails if it grows more than the given factor from the smallest course to the largest.
+    Returns the exit code.
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(description="Time the status updates of the lecture tree.")
+    parser.add_argument("--sizes", default="1000,4000,16000",
+                        help="Comma separated numbers of lectures of the courses (default: 1000,4000,16000)")
+    parser.add_argument("--changed", type=int, default=10, help="Lectures changed by each update (default: 10)")
+    parser.add_argument("--repeat", type=int, default=50, help="Updates timed for each course (default: 50)")
+    parser.add_argument("--factor", type=float, default=3.0,
+                        help="Largest growth allowed of the update time of the changed lectures (default: 3)")
+    arguments = parser.parse_args(argv)
+
+    application = QApplication.instance() or QApplication(sys.argv[:1])
+    context = ResourceContext()
+    print("{:>9} {:>12} {:>12}".format("lectures", "changed ms", "all ms"))
+
+    changed_times = []
+    for lectures in (int(value) for value in arguments.sizes.split(",")):
+        course = get_course(lectures)
+        tree = CourseStructure(context)
+        tree.resize(800, 600)
+        tree.add_course(course)
+        fetch_all(tree.tree_model)
+        tree.expandAll()
+        tree.show()
+        application.processEvents()
+
+        lecture_urls = list(tree.tree_model.lecture_nodes)
+        step = max(1, len(lecture_urls) // arguments.changed)
+        # The changed lectures are spread over the course, and the first one is on screen
+        changed = lecture_urls[::step][:arguments.changed]
+        changed_time = time_updates(application, tree, changed, arguments.repeat)
+        # What every progress report cost when the status of all the lectures was sent
+        all_time = time_updates(application, tree, lecture_urls, 1)
+        tree.close()
+        tree.deleteLater()
+
+        changed_times.append(changed_time)
+        print("{:>9} {:>12.3f} {:>12.3f}".format(lectures, changed_time, all_time))
+
+    if changed_times[-1] > changed_times[0] * arguments.factor:
+        print("Updating {changed} lectures took {growth:.1f} times longer in the largest course".format(
+            changed=arguments.changed, growth=changed_times[-1] / changed_times[0]), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
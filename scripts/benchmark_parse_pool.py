@@ -0,0 +1,98 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SOURCE_FOLDER = Path(__file__).resolve().parent.parent / "src" / "main" / "python"
+sys.path.insert(0, str(SOURCE_FOLDER))
+
+import page_parser
+import parse_pool
+from constants import LXML_PARSER, RESOLVER_WORKERS
+from sample_pages import get_lecture_page
+
+DATA_ID = "block-v1:course+type@video+block@{index}"
+
+
+def parse_pages(parse, pages, threads):
+    """Parse the lecture pages from a number of threads, like the resolver threads of the downloader.
+    Returns the time taken in seconds.
+
+    Arguments:
+        parse {function} -- Function parsing a lecture page, taking its HTML and the ID of the lecture block
+        pages {list} -- Tuples of HTML and ID of the lecture block
+        threads {int} -- Number of threads parsing pages
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda page: parse(*page), pages))
+    elapsed = time.perf_counter() - started
+    if any(result is None for result in results):
+        raise RuntimeError("A lecture page wasn't parsed")
+    return elapsed
+
+
+def measure(processes, parser_name, pages, threads):
+    """Measure the time taken to start the parse pool and to parse the pages with it.
+    Returns a tuple of startup and parsing time in seconds. Without processes, the pages are parsed in the threads.
+
+    Arguments:
+        processes {int} -- Number of parser processes, 0 to parse in-process
+        parser_name {str} -- Name of the parser backend
+        pages {list} -- Tuples of HTML and ID of the lecture block
+        threads {int} -- Number of threads parsing pages
+    """
+    if processes == 0:
+        parser = page_parser.get_parser(parser_name)
+        return 0.0, parse_pages(parser.parse_lecture_page, pages, threads)
+
+    started = time.perf_counter()
+    pool = parse_pool.ParsePool(processes=processes, parser_name=parser_name)
+    pool.start()
+    startup = time.perf_counter() - started
+    try:
+        return startup, parse_pages(pool.parse_lecture_page, pages, threads)
+    finally:
+        pool.close()
+
+
+def main(argv=None):
+    """Measure the startup cost of the parse pool and the rate at which it parses lecture pages,
+    for each number of processes, against parsing in the resolver threads.
+    Returns the exit code.
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(description="Measure the parse pool against parsing in-process.")
+    parser.add_argument("--processes", default="0,1,2,4",
+                        help="Comma separated numbers of parser processes, 0 parses in-process (default: 0,1,2,4)")
+    parser.add_argument("--pages", type=int, default=200, help="Number of lecture pages parsed (default: 200)")
+    parser.add_argument("--threads", type=int, default=RESOLVER_WORKERS,
+                        help="Number of threads parsing pages (default: {threads})".format(threads=RESOLVER_WORKERS))
+    parser.add_argument("--parser", default=LXML_PARSER, help="Parser backend (default: {name})".format(
+        name=LXML_PARSER))
+    arguments = parser.parse_args(argv)
+
+    if not parse_pool.is_supported():
+        print("Parser processes need Python 3.7 or later", file=sys.stderr)
+        return 1
+
+    pages = [(get_lecture_page(DATA_ID.format(index=index), "http://localhost/{index}.mp4".format(index=index)),
+              DATA_ID.format(index=index)) for index in range(arguments.pages)]
+    print("{pages} lecture pages of {size} KB, {threads} threads, {cpus} CPUs, parser {parser}".format(
+        pages=len(pages), size=len(pages[0][0]) // 1024, threads=arguments.threads, cpus=os.cpu_count(),
+        parser=arguments.parser))
+    print("{:>9} {:>10} {:>10} {:>10}".format("processes", "startup s", "parse s", "pages/s"))
+    for processes in (int(value) for value in arguments.processes.split(",")):
+        startup, elapsed = measure(processes, arguments.parser, pages, arguments.threads)
+        print("{:>9} {:>10.3f} {:>10.3f} {:>10.1f}".format(processes, startup, elapsed, len(pages) / elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+SOURCE_FOLDER = Path(__file__).resolve().parent.parent / "src" / "main" / "python"
+sys.path.insert(0, str(SOURCE_FOLDER))
+
+import page_parser
+from constants import HTML_PARSER, LXML_PARSER, TARGETED_PARSER
+from sample_pages import get_lecture_page, get_outline_page
+
+DATA_ID = "block-v1:course+type@video+block@0"
+MEDIA_URL = "http://localhost/0.mp4"
+
+
+def time_page(parse, repeat):
+    """Time the parsing of a page, keeping the fastest of several runs to leave out the noise of the machine.
+    Returns the time in milliseconds.
+
+    Arguments:
+        parse {function} -- Function parsing the page, without arguments
+        repeat {int} -- Number of runs
+    """
+    return min(timeit.repeat(parse, number=1, repeat=repeat)) * 1000
+
+
+def main(argv=None):
+    """Time each parser backend on a course outline page and a lecture page, and check that
+    they all find the same outline and the same video.
+    Returns the exit code.
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(description="Time the parser backends on each kind of page.")
+    parser.add_argument("--sections", type=int, default=12, help="Sections of the outline (default: 12)")
+    parser.add_argument("--subsections", type=int, default=5, help="Subsections of each section (default: 5)")
+    parser.add_argument("--units", type=int, default=6, help="Units of each subsection (default: 6)")
+    parser.add_argument("--transcript", type=int, default=1000,
+                        help="Lines of the transcript of the lecture page (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each parse (default: 20)")
+    arguments = parser.parse_args(argv)
+
+    outline_page = get_outline_page(arguments.sections, arguments.subsections, arguments.units)
+    lecture_page = get_lecture_page(DATA_ID, MEDIA_URL, transcript_lines=arguments.transcript)
+    print("Outline page of {outline} KB with {units} units, lecture page of {lecture} KB".format(
+        outline=len(outline_page) // 1024, units=arguments.sections * arguments.subsections * arguments.units,
+        lecture=len(lecture_page) // 1024))
+    print("{:>12} {:>12} {:>12}".format("parser", "outline ms", "lecture ms"))
+
+    problems = []
+    outlines = {}
+    for name in (HTML_PARSER, LXML_PARSER, TARGETED_PARSER):
+        backend = page_parser.get_parser(name)
+        outlines[name] = backend.parse_course_outline(outline_page)
+        details = backend.parse_lecture_page(lecture_page, DATA_ID)
+        if details is None or details[1] != MEDIA_URL:
+            problems.append("{name} didn't find the video of the lecture page".format(name=name))
+
+        outline_time = time_page(lambda: backend.parse_course_outline(outline_page), arguments.repeat)
+        lecture_time = time_page(lambda: backend.parse_lecture_page(lecture_page, DATA_ID), arguments.repeat)
+        print("{:>12} {:>12.2f} {:>12.2f}".format(name, outline_time, lecture_time))
+
+    if any(outline != outlines[HTML_PARSER] for outline in outlines.values()):
+        problems.append("The parsers found different outlines")
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
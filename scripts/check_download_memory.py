@@ -0,0 +1,116 @@
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where only the Python allocations are measured
+    resource = None
+
+SOURCE_FOLDER = Path(__file__).resolve().parent.parent / "src" / "main" / "python"
+sys.path.insert(0, str(SOURCE_FOLDER))
+
+import http_client
+import utils
+from constants import DOWNLOAD_CHUNK_SIZE, DOWNLOAD_SEGMENTS
+from stub_edx import StubServer
+
+COURSE_KEY = "course"
+MEGABYTE = 1024 * 1024
+
+
+def serve(media_size, ports):
+    """Run the stub server, in its own process so that it doesn't count in the memory measured
+
+    Arguments:
+        media_size {int} -- Size in bytes of the video served
+        ports {Queue} -- Queue to which the port of the server is sent
+    """
+    server = StubServer([COURSE_KEY], 1, media_size=media_size)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def get_peak_rss():
+    """Get the peak resident memory of the process in bytes, or None if it can't be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main(argv=None):
+    """Download a large video from a local stub server, and check that the peak memory of the download
+    stays under a bound that doesn't depend on the size of the video.
+    Returns the exit code.
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(description="Measure the peak memory of downloading a large video.")
+    parser.add_argument("--size", type=int, default=300, help="Size of the video in MB (default: 300)")
+    parser.add_argument("--segments", type=int, default=DOWNLOAD_SEGMENTS,
+                        help="Number of segments of the download (default: {segments})".format(
+                            segments=DOWNLOAD_SEGMENTS))
+    parser.add_argument("--limit", type=int, default=64,
+                        help="Largest increase of the peak memory allowed, in MB (default: 64)")
+    arguments = parser.parse_args(argv)
+
+    size = arguments.size * MEGABYTE
+    ports = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=serve, args=(size, ports), daemon=True)
+    server_process.start()
+    try:
+        port = ports.get(timeout=30)
+        url = "http://127.0.0.1:{port}/courses/{course_key}/media/0.mp4".format(port=port, course_key=COURSE_KEY)
+        http_client.configure(pool_maxsize=max(1, arguments.segments))
+
+        with tempfile.TemporaryDirectory() as folder:
+            rss_before = get_peak_rss()
+            tracemalloc.start()
+            started = time.perf_counter()
+            downloaded = utils.download_file(url, folder, "lecture", segments=arguments.segments, segment_threshold=1)
+            elapsed = time.perf_counter() - started
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rss_after = get_peak_rss()
+            received = Path(folder, "lecture.mp4").stat().st_size if downloaded else 0
+    finally:
+        http_client.get_client().close()
+        server_process.terminate()
+        server_process.join()
+
+    print("Downloaded {received} of {size} MB with {segments} segments in {elapsed:.1f}s".format(
+        received=received // MEGABYTE, size=arguments.size, segments=arguments.segments, elapsed=elapsed))
+    print("Peak Python allocations: {peak:.1f} MB (chunk size {chunk} MB)".format(
+        peak=traced_peak / MEGABYTE, chunk=DOWNLOAD_CHUNK_SIZE / MEGABYTE))
+
+    problems = []
+    if received != size:
+        problems.append("The video wasn't fully downloaded")
+    if traced_peak > arguments.limit * MEGABYTE:
+        problems.append("Python allocations peaked at {peak:.1f} MB, above {limit} MB".format(
+            peak=traced_peak / MEGABYTE, limit=arguments.limit))
+    if rss_before is not None:
+        growth = rss_after - rss_before
+        print("Peak RSS: {before:.1f} MB before, {after:.1f} MB after, {growth:.1f} MB more".format(
+            before=rss_before / MEGABYTE, after=rss_after / MEGABYTE, growth=growth / MEGABYTE))
+        if growth > arguments.limit * MEGABYTE:
+            problems.append("Peak RSS grew by {growth:.1f} MB, above {limit} MB".format(
+                growth=growth / MEGABYTE, limit=arguments.limit))
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
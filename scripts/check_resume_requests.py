@@ -0,0 +1,156 @@
+import argparse
+import logging
+import multiprocessing
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+SOURCE_FOLDER = Path(__file__).resolve().parent.parent / "src" / "main" / "python"
+sys.path.insert(0, str(SOURCE_FOLDER))
+
+from configure import Configuration
+from constants import CONFIG_FILE
+from entities import Course
+from orchestrator import DownloadOrchestrator, create_downloader
+from stub_edx import StubServer
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_CONFIG_FILE = str(SOURCE_FOLDER.parent / "resources" / "base" / CONFIG_FILE)
+
+
+def get_configuration(config_file, base_url, cache_folder):
+    """Load the configuration, pointing the edX URLs to the stub server and the caches to a temporary folder.
+    The lecture cache is turned off, so that the downloaded state alone has to keep the lecture pages from being fetched.
+
+    Arguments:
+        config_file {str} -- Path to the configuration file
+        base_url {str} -- Base URL of the stub server
+        cache_folder {str} -- Folder of the outline cache
+    """
+    configuration = Configuration.from_file(config_file)
+    urls = configuration.data["websites"]["edX"]["urls"]
+    for name in urls:
+        urls[name] = base_url
+    downloads = configuration.data.setdefault("downloads", {})
+    downloads["cache_folder"] = cache_folder
+    downloads["lecture_cache"] = False
+    # Don't let the pacing of requests slow the check down
+    downloads["page_rate"] = downloads["page_max_rate"] = downloads["page_burst"] = 1000
+    downloads["segments"] = 1
+    return configuration
+
+
+class DetailsCounter(object):
+    def __init__(self, downloader):
+        """Count the calls to get_lecture_details of the downloader
+
+        Arguments:
+            downloader {EdXDownloader} -- The downloader whose lecture resolution is counted
+        """
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.get_lecture_details = downloader.get_lecture_details
+        downloader.get_lecture_details = self
+
+    def __call__(self, lecture_title, lecture_url):
+        with self.lock:
+            self.calls = self.calls + 1
+        return self.get_lecture_details(lecture_title, lecture_url)
+
+
+def download_courses(configuration, server, root_folder):
+    """Retrieve the outlines of the courses of the stub server and download their lectures, like a run of the application.
+    Returns whether every lecture was downloaded, and the number of lectures which were resolved.
+
+    Arguments:
+        configuration {Configuration} -- Configuration pointing to the stub server
+        server {StubServer} -- The stub server
+        root_folder {str} -- The destination folder of the downloads
+    """
+    downloader = create_downloader(configuration, "edX")
+    details = DetailsCounter(downloader)
+    try:
+        for course_key in server.courses:
+            downloader.courses[course_key] = Course(
+                name=course_key, url=server.get_course_url(course_key), data_course_key=course_key)
+        results = downloader.get_course_lectures(server.courses)
+        if not all(result.successful for result in results.values()):
+            return False, details.calls
+        downloaded = DownloadOrchestrator(configuration, downloader, progress_interval=0).run(
+            server.courses, root_folder)
+        return downloaded, details.calls
+    finally:
+        downloader.close()
+
+
+def print_counts(name, server, resolved):
+    """Print the requests counted by the stub server during a run
+
+    Arguments:
+        name {str} -- Name of the run
+        server {StubServer} -- The stub server
+        resolved {int} -- Number of lectures resolved during the run
+    """
+    print("{name}: {outlines} outlines, {lectures} lecture pages, {media} media, {resolved} lectures resolved".format(
+        name=name, outlines=server.counts["outline"], lectures=server.counts["lecture"],
+        media=server.counts["media"], resolved=resolved))
+
+
+def main(argv=None):
+    """Download the courses of a local stub server twice, and check that the second run, resuming the first one,
+    fetches each outline once, no lecture page or media, and resolves none of the downloaded lectures.
+    Returns the exit code.
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(description="Count the requests made when resuming downloaded courses.")
+    parser.add_argument("--courses", type=int, default=2, help="Number of courses (default: 2)")
+    parser.add_argument("--lectures", type=int, default=6, help="Number of lectures of each course (default: 6)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="Path to the configuration file")
+    arguments = parser.parse_args(argv)
+
+    server = StubServer(["course-{index}".format(index=index) for index in range(arguments.courses)],
+                        arguments.lectures).start()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            configuration = get_configuration(arguments.config, server.base_url, str(Path(folder, "cache")))
+            root_folder = str(Path(folder, "downloads"))
+
+            downloaded, resolved = download_courses(configuration, server, root_folder)
+            print_counts("First run", server, resolved)
+            if not downloaded:
+                print("First run didn't download every lecture", file=sys.stderr)
+                return 1
+
+            server.reset()
+            downloaded, resolved = download_courses(configuration, server, root_folder)
+            print_counts("Second run", server, resolved)
+            if not downloaded:
+                print("Second run failed", file=sys.stderr)
+                return 1
+    finally:
+        server.stop()
+
+    problems = []
+    for course_key in server.courses:
+        if server.counts[("outline", course_key)] != 1:
+            problems.append("{count} outline requests for {course_key}, expected 1".format(
+                count=server.counts[("outline", course_key)], course_key=course_key))
+    for kind in ("lecture", "media"):
+        if server.counts[kind] != 0:
+            problems.append("{count} {kind} requests, expected 0".format(count=server.counts[kind], kind=kind))
+    if resolved != 0:
+        problems.append("{count} downloaded lectures were resolved, expected 0".format(count=resolved))
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
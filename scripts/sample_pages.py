@@ -0,0 +1,83 @@
+from html import escape
+
+NAVIGATION_LINK = '<li class="nav-item"><a class="nav-link" href="/courses/{index}">Course {index}</a></li>'
+
+SEQUENCE_BUTTON = ('<button class="seq_other nav-item tab" data-id="block-v1:course+type@vertical+block@{index}" '
+                   'data-element="{index}"><span class="icon fa seq_vertical"></span>'
+                   '<span class="sequence-tooltip sr">Unit {index}</span></button>')
+
+TRANSCRIPT_LINE = '&lt;li data-index=&quot;{index}&quot;&gt;Line {index} of the transcript&lt;/li&gt;'
+
+OUTLINE_SECTION = ('<li class="outline-item section"><button class="section-name">'
+                   '<h3 class="section-title">Section {section} &amp; more</h3></button>'
+                   '<ol class="outline-item">{subsections}</ol></li>')
+
+OUTLINE_SUBSECTION = ('<li class="subsection accordion"><a class="subsection-text outline-button">'
+                      '<h4 class="subsection-title">Subsection {section}.{subsection}</h4>'
+                      '<span class="subtitle">Due Jan 1</span></a>'
+                      '<ol class="outline-item accordion-panel">{units}</ol></li>')
+
+OUTLINE_UNIT = ('<li class="vertical outline-item focusable">'
+                '<a class="outline-item focusable" href="https://courses.edx.org/courses/course/jump_to/block@{index}">'
+                '<div class="vertical-details"><div class="vertical-title">\n    Unit {index}\n  </div>'
+                '</div><span class="complete-checkmark fa fa-check"></span></a></li>')
+
+
+def get_navigation(links):
+    """Get the header navigation shared by the edX pages
+
+    Arguments:
+        links {int} -- Number of links in the navigation
+    """
+    return '<header><nav><ol class="nav">{links}</ol></nav></header>'.format(
+        links="".join(NAVIGATION_LINK.format(index=index) for index in range(links)))
+
+
+def get_outline_page(sections, subsections, units):
+    """Get a course outline page like the ones of edX, with the same markup around the titles and links
+
+    Arguments:
+        sections {int} -- Number of sections
+        subsections {int} -- Number of subsections of each section
+        units {int} -- Number of units of each subsection
+    """
+    index = 0
+    section_items = []
+    for section in range(sections):
+        subsection_items = []
+        for subsection in range(subsections):
+            unit_items = []
+            for _ in range(units):
+                unit_items.append(OUTLINE_UNIT.format(index=index))
+                index = index + 1
+            subsection_items.append(OUTLINE_SUBSECTION.format(
+                section=section, subsection=subsection, units="".join(unit_items)))
+        section_items.append(OUTLINE_SECTION.format(section=section, subsections="".join(subsection_items)))
+    return ('<html><head><title>Course Outline</title></head><body>{navigation}<main>'
+            '<ol id="course-outline-block-tree" class="outline">{sections}</ol></main></body></html>').format(
+        navigation=get_navigation(100), sections="".join(section_items))
+
+
+def get_lecture_page(data_id, media_url, units=20, transcript_lines=1000):
+    """Get the page of a video lecture like the ones of edX, where the video player is escaped HTML
+    inside the xblock, next to the navigation of the sequence and the transcript
+
+    Arguments:
+        data_id {str} -- ID of the lecture block
+        media_url {str} -- URL of the video
+
+    Keyword Arguments:
+        units {int} -- Number of units in the sequence navigation (default: {20})
+        transcript_lines {int} -- Number of lines of the transcript in the player (default: {1000})
+    """
+    buttons = "".join(SEQUENCE_BUTTON.format(index=index) for index in range(units))
+    transcript = "".join(TRANSCRIPT_LINE.format(index=index) for index in range(transcript_lines))
+    return ('<html><head><title>Lecture</title></head><body>{navigation}<main>'
+            '<nav class="sequence-nav">{buttons}</nav>'
+            '<div data-id="{data_id}" class="seq_video"></div>'
+            '<div class="xblock">&lt;div data-usage-id=&quot;{data_id}&quot; class=&quot;video&quot;&gt;'
+            '&lt;ol class=&quot;subtitles&quot;&gt;{transcript}&lt;/ol&gt;'
+            '&lt;a class=&quot;video-download-button&quot; href=&quot;{media_url}&quot;&gt;Download&lt;/a&gt;'
+            '&lt;/div&gt;</div></main></body></html>').format(
+        navigation=get_navigation(100), buttons=buttons, data_id=escape(data_id), transcript=transcript,
+        media_url=escape(media_url))
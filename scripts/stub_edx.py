@@ -0,0 +1,179 @@
+import collections
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+OUTLINE_PAGE = ('<html><body><ol id="course-outline-block-tree" class="outline">'
+                '<li class="outline-item section"><button class="section-name">'
+                '<h3 class="section-title">Section</h3></button><ol class="outline-item">'
+                '<li class="subsection accordion"><a class="subsection-text outline-button">'
+                '<h4 class="subsection-title">Subsection</h4></a><ol class="outline-item accordion-panel">'
+                '{lectures}</ol></li></ol></li></ol></body></html>')
+
+OUTLINE_LECTURE = ('<li class="vertical outline-item focusable"><a class="outline-item focusable" href="{url}">'
+                   '<div class="vertical-details"><div class="vertical-title">Lecture {index}</div></div></a></li>')
+
+LECTURE_PAGE = ('<html><body><div data-id="{data_id}" class="seq_video"></div>'
+                '<div class="xblock">&lt;div data-usage-id=&quot;{data_id}&quot;&gt;'
+                '&lt;a class=&quot;video-download-button&quot; href=&quot;{media_url}&quot;&gt;&lt;/a&gt;'
+                '&lt;/div&gt;</div></body></html>')
+
+MEDIA_CHUNK_SIZE = 1024 * 1024
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, courses, lectures, media_size=4096):
+        """Initialise the local server mimicking the edX pages of a fixed set of courses.
+        Every request is counted by kind: 'outline', 'lecture' and 'media', in total and per course.
+        The videos are streamed in chunks and accept Range requests, so that large ones can be served.
+
+        Arguments:
+            courses {list} -- Keys of the courses served
+            lectures {int} -- Number of lectures of each course
+
+        Keyword Arguments:
+            media_size {int} -- Size in bytes of the video of every lecture (default: {4096})
+        """
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.courses = courses
+        self.lectures = lectures
+        self.media_size = media_size
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:{port}".format(port=self.server_port)
+
+    def start(self):
+        """Serve requests on a background thread
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket
+        """
+        self.shutdown()
+        self.server_close()
+
+    def get_course_url(self, course_key):
+        """Get the URL of the outline page of a course
+
+        Arguments:
+            course_key {str} -- Key of the course
+        """
+        return "{base_url}/courses/{course_key}/course/".format(base_url=self.base_url, course_key=course_key)
+
+    def get_lecture_url(self, course_key, index):
+        """Get the URL of a lecture page, in the jump_to form used by edX
+
+        Arguments:
+            course_key {str} -- Key of the course
+            index {int} -- Index of the lecture in the course
+        """
+        return "{base_url}/courses/{course_key}/jump_to/block-v1:{course_key}+type@vertical+block@{index}".format(
+            base_url=self.base_url, course_key=course_key, index=index)
+
+    def get_media_url(self, course_key, index):
+        """Get the URL of the video of a lecture
+
+        Arguments:
+            course_key {str} -- Key of the course
+            index {int} -- Index of the lecture in the course
+        """
+        return "{base_url}/courses/{course_key}/media/{index}.mp4".format(
+            base_url=self.base_url, course_key=course_key, index=index)
+
+    def count(self, kind, course_key):
+        """Count a request
+
+        Arguments:
+            kind {str} -- Kind of page requested
+            course_key {str} -- Key of the course it belongs to
+        """
+        with self.lock:
+            self.counts[kind] = self.counts[kind] + 1
+            self.counts[(kind, course_key)] = self.counts[(kind, course_key)] + 1
+
+    def reset(self):
+        """Forget the requests counted so far
+        """
+        with self.lock:
+            self.counts = collections.Counter()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        logger.debug("Stub server: " + format, *args)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) < 3 or parts[0] != "courses" or parts[1] not in self.server.courses:
+            self._send(404, b"", "text/html")
+            return
+
+        course_key = parts[1]
+        if parts[2] == "course":
+            self.server.count("outline", course_key)
+            lectures = "".join(OUTLINE_LECTURE.format(url=self.server.get_lecture_url(course_key, index), index=index)
+                               for index in range(self.server.lectures))
+            self._send(200, OUTLINE_PAGE.format(lectures=lectures).encode("utf-8"), "text/html")
+        elif parts[2] == "jump_to" and len(parts) > 3:
+            self.server.count("lecture", course_key)
+            index = parts[3].split("@")[-1]
+            page = LECTURE_PAGE.format(data_id=parts[3], media_url=self.server.get_media_url(course_key, index))
+            self._send(200, page.encode("utf-8"), "text/html")
+        elif parts[2] == "media" and len(parts) > 3:
+            self.server.count("media", course_key)
+            self._send_media()
+        else:
+            self._send(404, b"", "text/html")
+
+    def _send_media(self):
+        size = self.server.media_size
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match is not None:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{size}".format(size=size))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        self.send_response(206 if match is not None else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"{size}"'.format(size=size))
+        if match is not None:
+            self.send_header("Content-Range", "bytes {start}-{end}/{size}".format(start=start, end=end, size=size))
+        self.end_headers()
+
+        chunk = b"\0" * MEDIA_CHUNK_SIZE
+        remaining = end - start + 1
+        try:
+            while remaining > 0:
+                self.wfile.write(chunk[:remaining])
+                remaining = remaining - min(remaining, MEDIA_CHUNK_SIZE)
+        except ConnectionError:
+            # Segmented downloads close the first response once they have read their own range
+            logger.debug("Stub server: %s closed the connection", self.path)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from constants import (LECTURE_CACHE_FILE, LECTURE_CACHE_TTL,
+                       OUTLINE_CACHE_FOLDER, OUTLINE_CACHE_SIZE,
+                       OUTLINE_CACHE_TTL, STATE_FLUSH_COUNT)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def _write_json(path, data):
+    """Write the data to a temporary file and replace the file with it, so readers never see a partial file
+
+    Arguments:
+        path {Path} -- Path of the file
+        data {dict} -- Data to be written
+    """
+    temporary_path = Path(str(path) + ".tmp")
+    with temporary_path.open(mode="w") as file:
+        json.dump(data, file)
+    os.replace(str(temporary_path), str(path))
+
+
+class OutlineCache(object):
+    def __init__(self, cache_folder, ttl=OUTLINE_CACHE_TTL, max_size=OUTLINE_CACHE_SIZE):
+        """Initialise the on-disk cache of course outlines.
+        Each course has one file with its parsed outline, the ETag and Last-Modified of the outline page,
+        and a digest of the page, so that an unchanged page doesn't have to be parsed again.
+
+        Arguments:
+            cache_folder {str} -- Folder in which the cache is stored
+
+        Keyword Arguments:
+            ttl {float} -- Seconds after which an entry is discarded (default: {OUTLINE_CACHE_TTL})
+            max_size {int} -- Maximum size in bytes of all entries. Least recently used are evicted first (default: {OUTLINE_CACHE_SIZE})
+        """
+        self.folder = Path(cache_folder, OUTLINE_CACHE_FOLDER)
+        self.ttl = ttl
+        self.max_size = max_size
+        # Outlines of several courses are saved concurrently, and eviction removes files of other courses
+        self.lock = threading.Lock()
+        os.makedirs(str(self.folder), exist_ok=True)
+
+    def _get_path(self, course_key):
+        """Get the path of the cache file of a course
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+        """
+        return Path(self.folder, hashlib.sha1(course_key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, course_key):
+        """Get the cached entry of the course, or None if it's missing or expired
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+        """
+        with self.lock:
+            return self._get(course_key)
+
+    def _get(self, course_key):
+        """Get the cached entry of the course while holding the lock
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+        """
+        path = self._get_path(course_key)
+        if not path.exists():
+            return None
+
+        try:
+            with path.open() as file:
+                entry = json.load(file, object_pairs_hook=OrderedDict)
+        except ValueError as error:
+            logger.error("Discarding corrupt outline cache %s: %s", str(path), error)
+            path.unlink()
+            return None
+
+        if time.time() - entry["fetched_at"] > self.ttl:
+            logger.debug("Outline cache of %s expired", course_key)
+            path.unlink()
+            return None
+
+        # The modification time is used to find the least recently used entries
+        os.utime(str(path), None)
+        return entry
+
+    def put(self, course_key, outline, etag=None, last_modified=None, digest=None):
+        """Save the outline of the course
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+            outline {OrderedDict} -- The course structure having sections, subsections and lectures
+
+        Keyword Arguments:
+            etag {str} -- ETag of the outline page (default: {None})
+            last_modified {str} -- Last-Modified of the outline page (default: {None})
+            digest {str} -- Digest of the outline page (default: {None})
+        """
+        entry = {
+            "course_key": course_key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "digest": digest,
+            "fetched_at": time.time(),
+            "outline": outline
+        }
+        with self.lock:
+            _write_json(self._get_path(course_key), entry)
+            self._evict()
+
+    def revalidated(self, course_key, entry):
+        """Mark the cached entry as fresh, after the server confirmed it hasn't changed
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+            entry {dict} -- The cached entry
+        """
+        entry["fetched_at"] = time.time()
+        with self.lock:
+            _write_json(self._get_path(course_key), entry)
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits in its maximum size
+        """
+        entries = sorted(self.folder.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        size = 0
+        for path in entries:
+            size = size + path.stat().st_size
+            if size > self.max_size:
+                logger.debug("Evicting outline cache %s", str(path))
+                path.unlink()
+
+    @staticmethod
+    def get_digest(text):
+        """Get the digest of a page, used to find out if it changed
+
+        Arguments:
+            text {str} -- Content of the page
+        """
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class LectureCache(object):
+    def __init__(self, cache_folder, ttl=LECTURE_CACHE_TTL, flush_count=STATE_FLUSH_COUNT):
+        """Initialise the on-disk cache of resolved lectures, so lecture pages aren't fetched on every run.
+        It's loaded once, and written after every few changes.
+
+        Arguments:
+            cache_folder {str} -- Folder in which the cache is stored
+
+        Keyword Arguments:
+            ttl {float} -- Seconds after which an entry is discarded (default: {LECTURE_CACHE_TTL})
+            flush_count {int} -- Number of changes after which the cache is written to disk (default: {STATE_FLUSH_COUNT})
+        """
+        self.path = Path(cache_folder, LECTURE_CACHE_FILE)
+        self.ttl = ttl
+        self.flush_count = flush_count
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.pending = 0
+        os.makedirs(str(cache_folder), exist_ok=True)
+
+        if self.path.exists():
+            try:
+                with self.path.open() as file:
+                    self.entries = json.load(file)
+            except ValueError as error:
+                logger.error("Discarding corrupt lecture cache %s: %s", str(self.path), error)
+
+    def get(self, lecture_url):
+        """Get the cached details of the lecture, or None if it's missing or expired
+
+        Arguments:
+            lecture_url {str} -- URL of the lecture
+        """
+        with self.lock:
+            entry = self.entries.get(lecture_url)
+            if entry is not None and time.time() - entry["resolved_at"] > self.ttl:
+                del self.entries[lecture_url]
+                self.pending = self.pending + 1
+                return None
+            return entry
+
+    def put(self, lecture, course_key=None):
+        """Save the resolved details of the lecture
+
+        Arguments:
+            lecture {Lecture} -- The resolved lecture
+
+        Keyword Arguments:
+            course_key {str} -- Course of the lecture, used to invalidate it when the outline changes (default: {None})
+        """
+        with self.lock:
+            self.entries[lecture.url] = {
+                "course_key": course_key,
+                "media_type": lecture.media_type,
+                "download_url": lecture.download_url,
+                "from_youtube": lecture.from_youtube,
+                "resolved_at": time.time()
+            }
+            self.pending = self.pending + 1
+            if self.pending >= self.flush_count:
+                self.flush()
+
+    def invalidate(self, lecture_url):
+        """Remove the lecture, after its cached details stopped working
+
+        Arguments:
+            lecture_url {str} -- URL of the lecture
+        """
+        with self.lock:
+            if self.entries.pop(lecture_url, None) is not None:
+                logger.debug("Invalidated cached lecture %s", lecture_url)
+                self.pending = self.pending + 1
+
+    def invalidate_course(self, course_key):
+        """Remove all lectures of the course, after its outline changed
+
+        Arguments:
+            course_key {str} -- Unique ID/key of the course
+        """
+        with self.lock:
+            lecture_urls = [lecture_url for lecture_url, entry in self.entries.items()
+                            if entry["course_key"] == course_key]
+            for lecture_url in lecture_urls:
+                del self.entries[lecture_url]
+            if lecture_urls:
+                logger.debug("Invalidated %d cached lectures of %s", len(lecture_urls), course_key)
+                self.pending = self.pending + 1
+                self.flush()
+
+    def flush(self):
+        """Write pending changes to disk
+        """
+        with self.lock:
+            if self.pending:
+                _write_json(self.path, self.entries)
+                self.pending = 0
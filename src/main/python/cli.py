@@ -0,0 +1,224 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import sys
+from pathlib import Path
+
+from configure import Configuration
+from constants import (CLI_PROGRESS_INTERVAL, CONFIG_FILE, EXIT_CANCELLED,
+                       EXIT_DOWNLOAD_FAILED, EXIT_LOGIN_FAILED,
+                       EXIT_RETRIEVE_FAILED, EXIT_SUCCESS, EXIT_USAGE,
+                       PASSWORD_ENV, USERNAME_ENV)
+from orchestrator import DownloadOrchestrator, create_downloader
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_CONFIG_FILE = str(Path(__file__).resolve().parent.parent / "resources" / "base" / CONFIG_FILE)
+
+
+def parse_arguments(argv=None):
+    """Parse the command line arguments
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    parser = argparse.ArgumentParser(
+        description="Download the videos of edX courses without the GUI.",
+        epilog="Credentials are read from {username} and {password}, or from the credentials file.".format(
+            username=USERNAME_ENV, password=PASSWORD_ENV))
+    parser.add_argument("--root", help="Folder to which the courses are downloaded")
+    parser.add_argument("--course", action="append", default=[], metavar="KEY",
+                        help="Key of a course to download. Can be repeated")
+    parser.add_argument("--match", action="append", default=[], metavar="REGEX",
+                        help="Download the courses whose name or key matches the regular expression. Can be repeated")
+    parser.add_argument("--all", action="store_true", help="Download all the courses")
+    parser.add_argument("--list", action="store_true", help="List the courses and exit")
+    parser.add_argument("--credentials", metavar="FILE",
+                        help="JSON file having the 'username' and 'password'")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="Path to the configuration file")
+    parser.add_argument("--website", default="edX", help="Website to download from (default: edX)")
+    parser.add_argument("--progress-interval", type=float, default=CLI_PROGRESS_INTERVAL, metavar="SECONDS",
+                        help="Seconds between two progress lines")
+    parser.add_argument("--quiet", action="store_true", help="Don't print progress")
+    parser.add_argument("--verbose", action="store_true", help="Print debug logs to stderr")
+    return parser.parse_args(argv)
+
+
+def get_credentials(arguments):
+    """Get the username and password from the credentials file or the environment
+
+    Arguments:
+        arguments {Namespace} -- The command line arguments
+    """
+    if arguments.credentials is not None:
+        with open(arguments.credentials) as file:
+            credentials = json.load(file)
+        return credentials.get("username"), credentials.get("password")
+    return os.environ.get(USERNAME_ENV), os.environ.get(PASSWORD_ENV)
+
+
+def select_courses(courses, keys, patterns, select_all=False):
+    """Get the keys of the courses selected by key or by regular expression, in the order of the dashboard
+
+    Arguments:
+        courses {dict} -- Dictionary of course keys and Course objects
+        keys {list} -- Keys of the courses to select
+        patterns {list} -- Regular expressions matched against the name and key of the courses
+
+    Keyword Arguments:
+        select_all {bool} -- Select all the courses (default: {False})
+    """
+    expressions = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    selected = []
+    for course_key, course in courses.items():
+        if (select_all or course_key in keys
+                or any(expression.search(course.name or "") or expression.search(course_key)
+                       for expression in expressions)):
+            selected.append(course_key)
+    return selected
+
+
+class ProgressPrinter(object):
+    def __init__(self, quiet=False):
+        """Initialise the printer of the download progress for the command line mode
+
+        Keyword Arguments:
+            quiet {bool} -- Don't print progress, only errors (default: {False})
+        """
+        self.quiet = quiet
+
+    def progress(self, stats):
+        """Print a line with the download progress
+
+        Arguments:
+            stats {ProgressStats} -- Snapshot of the download progress
+        """
+        self._print("[{percent:5.1f}%] {stats}".format(percent=stats.fraction * 100, stats=str(stats)))
+
+    def lecture_downloaded(self, job):
+        """Print the lecture which was downloaded
+
+        Arguments:
+            job {LectureJob} -- The downloaded lecture job
+        """
+        self._print("Downloaded " + str(job))
+
+    def lecture_failed(self, job, error):
+        """Print the lecture which failed after all its tries
+
+        Arguments:
+            job {LectureJob} -- The failed lecture job
+            error {Exception} -- The error of the last try
+        """
+        self._print("Failed {job}: {error}".format(job=str(job), error=error), file=sys.stderr)
+
+    def _print(self, text, file=None):
+        """Print the text unless in quiet mode. Errors are always printed
+
+        Arguments:
+            text {str} -- Text to be printed
+
+        Keyword Arguments:
+            file {file} -- Stream to print to, stdout if None (default: {None})
+        """
+        if file is not None or not self.quiet:
+            # A single write, so that lines printed from different download threads don't interleave
+            stream = file or sys.stdout
+            stream.write(text + "\n")
+            stream.flush()
+
+
+def main(argv=None):
+    """Run the command line mode. Returns the exit code
+
+    Keyword Arguments:
+        argv {list} -- The arguments, without the program name. Uses sys.argv if None (default: {None})
+    """
+    arguments = parse_arguments(argv)
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.DEBUG if arguments.verbose else logging.WARNING)
+    logging.basicConfig(level=logging.DEBUG, handlers=[handler])
+
+    if not arguments.list and arguments.root is None:
+        print("--root is required to download", file=sys.stderr)
+        return EXIT_USAGE
+    if not (arguments.list or arguments.all or arguments.course or arguments.match):
+        print("Select courses with --course, --match or --all", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        username, password = get_credentials(arguments)
+    except (OSError, ValueError) as error:
+        print("Couldn't read the credentials file: {error}".format(error=error), file=sys.stderr)
+        return EXIT_USAGE
+    if not username or not password:
+        print("Credentials are missing. Set {username} and {password} or use --credentials".format(
+            username=USERNAME_ENV, password=PASSWORD_ENV), file=sys.stderr)
+        return EXIT_USAGE
+
+    configuration = Configuration.from_file(arguments.config)
+    downloader = create_downloader(configuration, arguments.website)
+    if downloader is None:
+        print("Unsupported website: " + arguments.website, file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        if not downloader.login(username, password):
+            print("Couldn't login. Check the credentials and network connection", file=sys.stderr)
+            return EXIT_LOGIN_FAILED
+
+        if arguments.list:
+            for course_key, course in downloader.courses.items():
+                print("{key}\t{name} | {university} | {date}".format(
+                    key=course_key, name=course.name, university=course.university, date=course.date))
+            return EXIT_SUCCESS
+
+        course_keys = select_courses(downloader.courses, arguments.course, arguments.match, arguments.all)
+        if not course_keys:
+            print("No course matched the selection", file=sys.stderr)
+            return EXIT_RETRIEVE_FAILED
+        results = downloader.get_course_lectures(course_keys)
+        for result in results.values():
+            if not result.successful:
+                print("Couldn't retrieve the outline of {course_id}: {reason}".format(
+                    course_id=result.course_id, reason=result.reason), file=sys.stderr)
+        course_keys = [course_key for course_key, result in results.items() if result.successful]
+        if not course_keys:
+            return EXIT_RETRIEVE_FAILED
+        # The courses which were retrieved are still downloaded, but the run is reported as failed
+        retrieve_failed = len(course_keys) < len(results)
+
+        printer = ProgressPrinter(quiet=arguments.quiet)
+        orchestrator = DownloadOrchestrator(configuration, downloader,
+                                            progress_interval=arguments.progress_interval,
+                                            on_progress=printer.progress,
+                                            on_lecture_downloaded=printer.lecture_downloaded,
+                                            on_lecture_failed=printer.lecture_failed)
+
+        def _cancel(signal_number, frame):
+            print("Cancelling, part files are kept for resuming", file=sys.stderr)
+            orchestrator.cancel()
+
+        signal.signal(signal.SIGINT, _cancel)
+        signal.signal(signal.SIGTERM, _cancel)
+        downloaded = orchestrator.run(course_keys, arguments.root)
+
+        if orchestrator.job.is_cancelled():
+            return EXIT_CANCELLED
+        if not downloaded:
+            print("{count} lecture(s) couldn't be downloaded, run again to retry them".format(
+                count=len(orchestrator.failures)), file=sys.stderr)
+            return EXIT_DOWNLOAD_FAILED
+        return EXIT_RETRIEVE_FAILED if retrieve_failed else EXIT_SUCCESS
+    finally:
+        downloader.close()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
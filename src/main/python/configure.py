@@ -1,6 +1,6 @@
 import json
 
-from constants import CONFIG_FILE
+from constants import CONFIG_FILE, CONNECT_TIMEOUT, READ_TIMEOUT
 
 
 class Configuration(object):
@@ -14,6 +14,19 @@ class Configuration(object):
         with open(application_context.get_resource(CONFIG_FILE)) as file:
             self.data = json.load(file)
 
+    @classmethod
+    def from_file(cls, config_file):
+        """Load the configuration from a file without an application context, like in the command line mode
+        
+        Arguments:
+            config_file {str} -- Path to the configuration file
+        """
+        configuration = cls.__new__(cls)
+        configuration.application_context = None
+        with open(config_file) as file:
+            configuration.data = json.load(file)
+        return configuration
+
     def populate_website_chooser(self, combobox):
         """Util method to populate the UI website dropdown
         
@@ -43,3 +56,20 @@ class Configuration(object):
             website_name {str} -- Name of the website
         """
         return self.data["websites"][website_name]["headers"]
+
+    def get_download_setting(self, name, default=None):
+        """Get a setting used while downloading, falling back to the default if its not configured
+        
+        Arguments:
+            name {str} -- Name of the setting
+        
+        Keyword Arguments:
+            default {object} -- Value to use when the setting is missing (default: {None})
+        """
+        return self.data.get("downloads", {}).get(name, default)
+
+    def get_request_timeout(self):
+        """Get the (connect, read) timeout in seconds of the requests made while downloading
+        """
+        return (self.get_download_setting("connect_timeout", CONNECT_TIMEOUT),
+                self.get_download_setting("read_timeout", READ_TIMEOUT))
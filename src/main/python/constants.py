@@ -31,6 +31,8 @@ STATUS_INDEX = 1
 
 # Parameters used on GUI
 WINDOW_SIZE = (1000, 900)
+LATENCY_CHECK_INTERVAL = 100
+LATENCY_WARNING_THRESHOLD = 200
 VERTICAL_SPACING = 30
 HORIZONTAL_SPACING = 10
 FORM_HORIZONTAL_SPACING = 50
@@ -47,15 +49,92 @@ CRITICAL = 'Critical'
 CONFIG_FILE = "config/config.json"
 LOADING_GIF = "images/loading.gif"
 DOWNLOAD_DATA = "downloads.json"
+DOWNLOAD_DATA_VERSION = 2
+DOWNLOAD_CATALOG = "downloads.sqlite3"
 MEDIA_ICON = "images/media_icon.svg"
 SESSION_LOG = "session.log"
+CACHE_FOLDER = ".course-downloader"
+OUTLINE_CACHE_FOLDER = "outlines"
+LECTURE_CACHE_FILE = "lectures.json"
+
+# constants used by the command line mode
+USERNAME_ENV = "EDX_USERNAME"
+PASSWORD_ENV = "EDX_PASSWORD"
+CLI_PROGRESS_INTERVAL = 5
+EXIT_SUCCESS = 0
+EXIT_DOWNLOAD_FAILED = 1
+EXIT_USAGE = 2
+EXIT_LOGIN_FAILED = 3
+EXIT_RETRIEVE_FAILED = 4
+EXIT_CANCELLED = 130
 
 # constants used while downloading videos
+# Tries of each page request and each lecture download
 RETRY_LIMIT = 5
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
+# Retry-After longer than this gives up instead of waiting
+RETRY_AFTER_LIMIT = 300
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Seconds to wait for a connection, and for the next bytes of a response, before the request fails and is tried again
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
+# Seconds between checks of an open circuit while its trial call is running
+CIRCUIT_TRIAL_POLL = 1
+# Requests per second to the website pages, and to each media host
+PAGE_RATE = 4
+PAGE_MAX_RATE = 16
+PAGE_BURST = 8
+MEDIA_RATE = 8
+MEDIA_MAX_RATE = 32
+MEDIA_BURST = 16
+RATE_MIN = 0.5
+# Requests per second added every second while no request is throttled
+RATE_INCREASE = 0.5
+RATE_DECREASE = 0.5
+THROTTLE_STATUSES = (429, 503)
 WINDOWS_EXCLUDED_CHARACTERS = '":?*<>|'
 YOUTUBE_URL_PART = "https://www.youtube.com/watch?v="
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PART_EXTENSION = ".part"
+PART_METADATA_EXTENSION = ".json"
+DOWNLOAD_SEGMENTS = 4
+SEGMENT_THRESHOLD = 50 * 1024 * 1024
+STATE_FLUSH_COUNT = 10
+STATE_FLUSH_INTERVAL = 5
+SQLITE_BUSY_TIMEOUT = 30
+# Seconds after which the claim on a lecture by a process which stopped refreshing it can be taken over
+CLAIM_TIMEOUT = 5 * 60
+CLAIM_REFRESH_INTERVAL = 60
+OUTLINE_CACHE_TTL = 7 * 24 * 60 * 60
+OUTLINE_CACHE_SIZE = 20 * 1024 * 1024
+LECTURE_CACHE_TTL = 3 * 24 * 60 * 60
+YOUTUBE_WORKERS = 2
+PROGRESS_INTERVAL = 0.25
+PROGRESS_SMOOTHING = 0.3
+# Single file formats up to 720p, so nothing has to be merged and fewer bytes are transferred
+YOUTUBE_FORMAT = "best[height<=720]/best"
+
+# Backends used to store the state of downloads
+JSON_BACKEND = "json"
+SQLITE_BACKEND = "sqlite"
+STATE_BACKEND = JSON_BACKEND
+RESOLVER_WORKERS = 4
+OUTLINE_WORKERS = 4
+DOWNLOAD_WORKERS = 3
+MEDIA_POOL_CONNECTIONS = 10
+MEDIA_POOL_MAXSIZE = 16
 
 # Types of media on webpage recognised
 VIDEO = "seq_video"
 OTHER = "seq_other"
 PROBLEM = "seq_problem"
+
+# Backends used to parse pages
+HTML_PARSER = "html.parser"
+LXML_PARSER = "lxml"
+TARGETED_PARSER = "targeted"
+# Number of processes parsing pages, 0 to parse in the resolving threads
+PARSE_PROCESSES = 0
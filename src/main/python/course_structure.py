@@ -1,88 +1,219 @@
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QApplication, QStyle, QTreeWidget, QTreeWidgetItem, QHeaderView
+from PyQt5.QtWidgets import QApplication, QHeaderView, QStyle, QTreeView
 
-from constants import (COURSES_LABEL, MEDIA_ICON, STATUS_LABEL, COURSES_INDEX, 
+from constants import (COURSES_LABEL, MEDIA_ICON, STATUS_LABEL, COURSES_INDEX,
                         STATUS_INDEX, BLANK_VALUE)
 
+# Role used to get the status text of a lecture from the model
+STATUS_ROLE = Qt.UserRole + 1
 
-class CourseStructure(QTreeWidget):
+
+class _TreeNode(object):
+    def __init__(self, name, parent=None, row=0, outline=None, lecture_url=None):
+        """Initialise a node of the lecture tree. The children of a folder are created only when it's expanded.
+
+        Arguments:
+            name {str} -- Name of the course, section, subsection or lecture
+
+        Keyword Arguments:
+            parent {_TreeNode} -- The parent node (default: {None})
+            row {int} -- Position of the node under its parent (default: {0})
+            outline {OrderedDict} -- Part of the course outline under the node, None for lectures (default: {None})
+            lecture_url {str} -- URL of the lecture, None for folders (default: {None})
+        """
+        self.name = name
+        self.parent = parent
+        self.row = row
+        self.outline = outline
+        self.lecture_url = lecture_url
+        self.children = []
+        self.fetched = outline is None
+
+    def is_folder(self):
+        return self.lecture_url is None
+
+
+class CourseTreeModel(QAbstractItemModel):
+    def __init__(self, application_context, parent=None):
+        """Initialise the model of the lecture tree over the course outlines.
+        Rows are created lazily when a folder is expanded, and the icons are loaded once and shared by all rows.
+
+        Arguments:
+            application_context {ApplicationContext} -- Reference to application context
+
+        Keyword Arguments:
+            parent {QObject} -- Parent of the model (default: {None})
+        """
+        super().__init__(parent)
+        self.root = _TreeNode(None)
+        self.root.fetched = True
+        self.folder_icon = QApplication.style().standardIcon(QStyle.SP_DirIcon)
+        self.media_icon = QIcon(application_context.get_resource(MEDIA_ICON))
+        self.statuses = {}
+        self.lecture_nodes = {}
+
+    def _get_node(self, index):
+        """Get the node of the index, or the root node for an invalid index
+
+        Arguments:
+            index {QModelIndex} -- Index of the node
+        """
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def add_course(self, course):
+        """Add a course as a top level row. Its sections are created when it's expanded
+
+        Arguments:
+            course {Course} -- The course object to be added
+        """
+        row = len(self.root.children)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.root.children.append(_TreeNode(course.name, self.root, row, outline=course.course_outline))
+        self.endInsertRows()
+
+    def update_lecture_status(self, lecture_statuses):
+        """Update the status of the lectures which changed. Only the rows already created are repainted
+
+        Arguments:
+            lecture_statuses {dict} -- Dictionary of changed lecture urls and their new status
+        """
+        self.statuses.update(lecture_statuses)
+        for lecture_url in lecture_statuses:
+            node = self.lecture_nodes.get(lecture_url)
+            if node is not None:
+                status_index = self.createIndex(node.row, STATUS_INDEX, node)
+                self.dataChanged.emit(status_index, status_index, [Qt.DisplayRole, STATUS_ROLE])
+
+    def clear(self):
+        """Remove all the courses
+        """
+        self.beginResetModel()
+        self.root.children = []
+        self.statuses = {}
+        self.lecture_nodes = {}
+        self.endResetModel()
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._get_node(parent)
+        if not self.hasIndex(row, column, parent) or row >= len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, COURSES_INDEX, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._get_node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._get_node(parent)
+        if node.fetched:
+            return len(node.children) > 0
+        return len(node.outline) > 0
+
+    def canFetchMore(self, parent):
+        return not self._get_node(parent).fetched
+
+    def fetchMore(self, parent):
+        """Create the rows of the sections, subsections or lectures under the folder being expanded
+
+        Arguments:
+            parent {QModelIndex} -- Index of the folder
+        """
+        node = self._get_node(parent)
+        if node.fetched:
+            return
+        node.fetched = True
+        if not node.outline:
+            return
+
+        self.beginInsertRows(parent, 0, len(node.outline) - 1)
+        for row, (key, value) in enumerate(node.outline.items()):
+            if isinstance(value, dict):
+                child = _TreeNode(key, node, row, outline=value)
+            else:
+                # Lectures are stored as URL: title
+                child = _TreeNode(value, node, row, lecture_url=key)
+                self.lecture_nodes[key] = child
+            node.children.append(child)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+
+        if role == STATUS_ROLE:
+            return None if node.is_folder() else self.statuses.get(node.lecture_url, BLANK_VALUE)
+        if role == Qt.DisplayRole and index.column() == COURSES_INDEX:
+            return node.name
+        if role == Qt.DisplayRole and index.column() == STATUS_INDEX:
+            return "" if node.is_folder() else self.statuses.get(node.lecture_url, BLANK_VALUE)
+        if role == Qt.DecorationRole and index.column() == COURSES_INDEX:
+            return self.folder_icon if node.is_folder() else self.media_icon
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return [COURSES_LABEL, STATUS_LABEL][section]
+        return None
+
+
+class CourseStructure(QTreeView):
     def __init__(self, application_context):
         """Initialise the lecture tree
-        
+
         Arguments:
             application_context {ApplicationContext} -- Reference to application context
         """
         super().__init__()
-        self.setColumnCount(2)
+        self.application_context = application_context
+        self.courses = []
+        self.tree_model = CourseTreeModel(application_context, self)
+        self.setModel(self.tree_model)
+        self.setUniformRowHeights(True)
         self.header().setStretchLastSection(False)
         self.header().setSectionResizeMode(COURSES_INDEX, QHeaderView.Stretch)
         self.header().setSectionResizeMode(STATUS_INDEX, QHeaderView.ResizeToContents)
-        self.application_context = application_context
-        self.courses = []
-        self.lecture_items = {}
-        self.setHeaderLabels([COURSES_LABEL, STATUS_LABEL])
+        # Fit the status column to the rows on screen only. Otherwise every status change measures
+        # up to 1000 rows, and the cost of an update grows with the number of expanded lectures
+        self.header().setResizeContentsPrecision(0)
 
     def add_course(self, course):
         """Add a course to the lecture tree
-        
+
         Arguments:
             course {Course} -- The course object to be added
         """
-        courseItem = QTreeWidgetItem(self, [course.name, ''])
-        self.addTopLevelItem(courseItem)
-
-        courseItem.setIcon(
-            0, QApplication.style().standardIcon(QStyle.SP_DirIcon))
         self.courses.append(course)
-        self.add_sections(course, courseItem)
+        self.tree_model.add_course(course)
+
+    def update_lecture_status(self, lecture_statuses):
+        """Update the status of the lecture items which changed
 
-    def add_sections(self, course, courseItem):
-        """Add all the associated sections, lectures of a course
-        
-        Arguments:
-            course {Course} -- The course object of which sections are to be added
-            courseItem {QTreeWidgetItem} -- The QTreeWidget corresponding to the course
-        """
-        for section in course.course_outline:
-            section_item = self._add_child(courseItem, section,
-                                QApplication.style().standardIcon(QStyle.SP_DirIcon))
-
-            for subsection in course.course_outline[section]:
-                subsection_item = self._add_child(section_item, subsection,
-                                QApplication.style().standardIcon(QStyle.SP_DirIcon))
-
-                for lecture in course.course_outline[section][subsection]:
-                    icon = QIcon(self.application_context.get_resource(MEDIA_ICON))
-                    lecture_item = self._add_child(subsection_item, 
-                                course.course_outline[section][subsection][lecture],
-                                icon, BLANK_VALUE)
-                    self.lecture_items[lecture] = lecture_item
-
-    def _add_child(self, parent, child, icon, status=''):
-        """Util method to add child to a parent object
-        
         Arguments:
-            parent {QTreeWidgetItem} -- The parent element to which to add
-            child {QTreeWidgetItem} -- The child element to be added
-            icon {QStandardIcon} -- The icon to be set to the added element
+            lecture_statuses {dict} -- Dictionary of changed lecture urls and their new status
         """
-        item = QTreeWidgetItem(parent, [child, status])
-        item.setIcon(COURSES_INDEX, icon)
-        parent.addChild(item)
-
-        return item
+        self.tree_model.update_lecture_status(lecture_statuses)
 
-    # TODO: Iterating over all lectures for each status update is wasteful.
-    # How to implement data binding in PyQt
-    def update_lecture_status(self, lectures):
-        """Update the status of lecture items
-        
-        Arguments:
-            lectures {dict} -- Dictionary of lecture urls and corresponding lecture objects
+    def clear(self):
+        """Clear the lecture tree
         """
-        for lecture, lecture_object in lectures.items():
-            lecture_item = self.lecture_items[lecture]
-            lecture_item.setText(STATUS_INDEX, lecture_object.status)
+        self.courses = []
+        self.tree_model.clear()
 
     def clear_all(self):
         """Clear the lecture tree
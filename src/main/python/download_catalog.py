@@ -0,0 +1,251 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from constants import (CLAIM_REFRESH_INTERVAL, CLAIM_TIMEOUT, DOWNLOAD_CATALOG,
+                       DOWNLOAD_DATA, SQLITE_BUSY_TIMEOUT)
+from download_state import DownloadState
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    course_key TEXT NOT NULL UNIQUE,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    title TEXT NOT NULL,
+    UNIQUE (course_id, title)
+);
+CREATE TABLE IF NOT EXISTS subsections (
+    id INTEGER PRIMARY KEY,
+    section_id INTEGER NOT NULL REFERENCES sections(id),
+    title TEXT NOT NULL,
+    UNIQUE (section_id, title)
+);
+CREATE TABLE IF NOT EXISTS lectures (
+    id INTEGER PRIMARY KEY,
+    subsection_id INTEGER NOT NULL REFERENCES subsections(id),
+    course_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    downloaded INTEGER NOT NULL DEFAULT 0,
+    download_url TEXT,
+    path TEXT,
+    UNIQUE (course_key, url)
+);
+CREATE INDEX IF NOT EXISTS lectures_url ON lectures (url);
+CREATE TABLE IF NOT EXISTS claims (
+    course_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (course_key, url)
+);
+CREATE INDEX IF NOT EXISTS claims_owner ON claims (owner);
+"""
+
+
+class DownloadCatalog(object):
+    def __init__(self, root_folder, claim_timeout=CLAIM_TIMEOUT, refresh_interval=CLAIM_REFRESH_INTERVAL):
+        """Initialise the SQLite catalog of downloads in the root folder.
+        It has the same interface as DownloadState, but every change is written immediately
+        in its own transaction, so several downloader processes can share one root folder.
+        A process claims a lecture before downloading it, so that two processes never write the same part file.
+        Claims are refreshed while the process runs, and one which wasn't refreshed for the claim timeout,
+        because its process stopped, can be taken over.
+        An existing downloads file is imported when the catalog is created.
+
+        Arguments:
+            root_folder {str} -- The destination folder selected for the downloads
+
+        Keyword Arguments:
+            claim_timeout {float} -- Seconds after which a claim which wasn't refreshed can be taken over (default: {CLAIM_TIMEOUT})
+            refresh_interval {float} -- Seconds between two refreshes of the claims of this process (default: {CLAIM_REFRESH_INTERVAL})
+        """
+        self.root_folder = root_folder
+        self.path = Path(root_folder, DOWNLOAD_CATALOG)
+        self.local = threading.local()
+        self.claim_timeout = claim_timeout
+        self.refresh_interval = refresh_interval
+        self.owner = "{host}:{pid}:{token}".format(host=socket.gethostname(), pid=os.getpid(), token=uuid.uuid4().hex)
+        self.claims_lock = threading.Lock()
+        self.claims_stopped = None
+        os.makedirs(str(root_folder), exist_ok=True)
+
+        created = not self.path.exists()
+        connection = self._get_connection()
+        connection.executescript(SCHEMA)
+        if created and Path(root_folder, DOWNLOAD_DATA).exists():
+            self._import_downloads_file()
+
+    def _get_connection(self):
+        """Get the connection of the current thread, since SQLite connections can't be shared between threads
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.local.connection = connection
+        return connection
+
+    def _import_downloads_file(self):
+        """Copy the lectures from the JSON downloads file into the catalog
+        """
+        logger.debug("Importing %s into %s", DOWNLOAD_DATA, str(self.path))
+        state = DownloadState(self.root_folder)
+        connection = self._get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for course_key, course_data in state.data["courses"].items():
+                for section, subsections in course_data.get("sections", {}).items():
+                    for subsection, lectures in subsections.items():
+                        subsection_id = self._get_subsection_id(
+                            connection, course_key, course_data.get("name"), section, subsection)
+                        for lecture_url, lecture_data in lectures.items():
+                            self._upsert_lecture(connection, subsection_id, course_key, lecture_url, lecture_data)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _get_subsection_id(self, connection, course_key, course_name, section, subsection):
+        """Get the row ID of the subsection, adding the course, section and subsection if missing
+        """
+        connection.execute("INSERT OR IGNORE INTO courses (course_key, name) VALUES (?, ?)",
+                           (course_key, course_name))
+        course_id = connection.execute("SELECT id FROM courses WHERE course_key = ?",
+                                       (course_key,)).fetchone()[0]
+        connection.execute("INSERT OR IGNORE INTO sections (course_id, title) VALUES (?, ?)",
+                           (course_id, section))
+        section_id = connection.execute("SELECT id FROM sections WHERE course_id = ? AND title = ?",
+                                        (course_id, section)).fetchone()[0]
+        connection.execute("INSERT OR IGNORE INTO subsections (section_id, title) VALUES (?, ?)",
+                           (section_id, subsection))
+        return connection.execute("SELECT id FROM subsections WHERE section_id = ? AND title = ?",
+                                  (section_id, subsection)).fetchone()[0]
+
+    def _upsert_lecture(self, connection, subsection_id, course_key, lecture_url, lecture_data):
+        """Insert the lecture, or update it if it's already in the catalog
+        """
+        values = (subsection_id, lecture_data.get("title"), int(bool(lecture_data.get("downloaded"))),
+                  lecture_data.get("download_url"), lecture_data.get("path"), course_key, lecture_url)
+        connection.execute("INSERT OR IGNORE INTO lectures (course_key, url, subsection_id) VALUES (?, ?, ?)",
+                           (course_key, lecture_url, subsection_id))
+        connection.execute("UPDATE lectures SET subsection_id = ?, title = ?, downloaded = ?, download_url = ?, path = ? "
+                           "WHERE course_key = ? AND url = ?", values)
+
+    def is_downloaded(self, course_id, lecture_url):
+        """Check whether the lecture has already been downloaded
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            lecture_url {str} -- URL of the lecture page
+        """
+        row = self._get_connection().execute(
+            "SELECT downloaded FROM lectures WHERE course_key = ? AND url = ?", (course_id, lecture_url)).fetchone()
+        return bool(row[0]) if row else False
+
+    def save_lecture(self, course_id, section, subsection, course, lecture):
+        """Record the state of the lecture
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            section {str} -- Section of the lecture
+            subsection {str} -- Subsection of the lecture
+            course {Course} -- Selected Course object having all its details
+            lecture {Lecture} -- Lecture object having all its details
+        """
+        connection = self._get_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            subsection_id = self._get_subsection_id(connection, course_id, course.name, section, subsection)
+            self._upsert_lecture(connection, subsection_id, course_id, lecture.url, lecture.get_dict())
+            if lecture.downloaded:
+                connection.execute("DELETE FROM claims WHERE course_key = ? AND url = ? AND owner = ?",
+                                   (course_id, lecture.url, self.owner))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def claim_lecture(self, course_id, lecture_url):
+        """Claim the lecture for this process before downloading it.
+        Returns False if it was downloaded in the meantime, or another process claimed it.
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            lecture_url {str} -- URL of the lecture page
+        """
+        connection = self._get_connection()
+        # Taking the write lock first, so that no other process can claim it between the checks and the insert
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT downloaded FROM lectures WHERE course_key = ? AND url = ?",
+                                     (course_id, lecture_url)).fetchone()
+            claim = connection.execute("SELECT owner, claimed_at FROM claims WHERE course_key = ? AND url = ?",
+                                       (course_id, lecture_url)).fetchone()
+            now = time.time()
+            if (row is not None and row[0]) or (claim is not None and claim[0] != self.owner
+                                                and now - claim[1] < self.claim_timeout):
+                connection.execute("COMMIT")
+                return False
+
+            if claim is not None and claim[0] != self.owner:
+                logger.info("Taking over the claim of %s by %s, which wasn't refreshed", lecture_url, claim[0])
+            connection.execute("INSERT OR REPLACE INTO claims (course_key, url, owner, claimed_at) VALUES (?, ?, ?, ?)",
+                               (course_id, lecture_url, self.owner, now))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        self._start_refreshing()
+        return True
+
+    def release_claims(self):
+        """Release the lectures claimed by this process which weren't downloaded, and stop refreshing the claims
+        """
+        with self.claims_lock:
+            if self.claims_stopped is not None:
+                self.claims_stopped.set()
+                self.claims_stopped = None
+        self._get_connection().execute("DELETE FROM claims WHERE owner = ?", (self.owner,))
+
+    def _start_refreshing(self):
+        """Start the thread refreshing the claims of this process, if it isn't running
+        """
+        with self.claims_lock:
+            if self.claims_stopped is not None:
+                return
+            self.claims_stopped = threading.Event()
+            threading.Thread(target=self._refresh_claims, args=(self.claims_stopped,), daemon=True).start()
+
+    def _refresh_claims(self, stopped):
+        """Keep the claims of this process from timing out, until the claims are released
+
+        Arguments:
+            stopped {Event} -- Set when the claims are released
+        """
+        while not stopped.wait(self.refresh_interval):
+            try:
+                self._get_connection().execute("UPDATE claims SET claimed_at = ? WHERE owner = ?",
+                                               (time.time(), self.owner))
+            except sqlite3.Error as error:
+                logger.error("Couldn't refresh the claims in %s: %s", str(self.path), error)
+
+    def flush(self):
+        """Nothing to do, since every change is committed when it's saved
+        """
+        pass
@@ -0,0 +1,85 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from constants import DOWNLOAD_WORKERS, RESOLVER_WORKERS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class DownloadScheduler(object):
+    def __init__(self, resolver_workers=RESOLVER_WORKERS, download_workers=DOWNLOAD_WORKERS):
+        """Initialise the scheduler which resolves and downloads lectures concurrently.
+        Lecture pages are resolved on one pool of workers, and the media is transferred on another,
+        so that the two can be limited separately.
+
+        Keyword Arguments:
+            resolver_workers {int} -- Number of lecture pages resolved at a time (default: {RESOLVER_WORKERS})
+            download_workers {int} -- Number of files transferred at a time (default: {DOWNLOAD_WORKERS})
+        """
+        self.resolver_workers = max(1, resolver_workers)
+        self.download_workers = max(1, download_workers)
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop picking up new jobs. Jobs already in progress are allowed to finish.
+        """
+        self.cancelled = True
+
+    def run(self, jobs, resolve, download, skip=None):
+        """Resolve all the jobs and download the ones that need downloading.
+        Blocks until every job is finished or skipped due to cancellation, and returns
+        the list of (job, exception) pairs for the jobs that failed.
+
+        Arguments:
+            jobs {list} -- List of LectureJob objects
+            resolve {function} -- Called with a job, returns the Lecture to be downloaded or None if there is nothing to download
+            download {function} -- Called with a job and the resolved Lecture
+
+        Keyword Arguments:
+            skip {function} -- Called with a job which isn't resolved or downloaded due to cancellation (default: {None})
+        """
+        lock = threading.Lock()
+        download_futures = {}
+        resolve_futures = {}
+
+        def _skip(job):
+            if skip is not None:
+                skip(job)
+
+        def _download(job, lecture):
+            if self.cancelled:
+                _skip(job)
+                return
+            download(job, lecture)
+
+        def _resolve(job, download_pool):
+            if self.cancelled:
+                _skip(job)
+                return
+            lecture = resolve(job)
+            if lecture is None:
+                return
+            if self.cancelled:
+                _skip(job)
+                return
+            with lock:
+                download_futures[download_pool.submit(_download, job, lecture)] = job
+
+        with ThreadPoolExecutor(self.download_workers) as download_pool:
+            with ThreadPoolExecutor(self.resolver_workers) as resolver_pool:
+                for job in jobs:
+                    resolve_futures[resolver_pool.submit(_resolve, job, download_pool)] = job
+                wait(resolve_futures)
+            # All resolutions are done, so no more downloads will be submitted
+            wait(download_futures)
+
+        errors = []
+        for futures in (resolve_futures, download_futures):
+            for future, job in futures.items():
+                if future.exception() is not None:
+                    logger.error("%s failed: %s", str(job), future.exception())
+                    errors.append((job, future.exception()))
+
+        return errors
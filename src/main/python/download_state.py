@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from constants import (DOWNLOAD_DATA, DOWNLOAD_DATA_VERSION, STATE_FLUSH_COUNT,
+                       STATE_FLUSH_INTERVAL)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class DownloadState(object):
+    def __init__(self, root_folder, flush_count=STATE_FLUSH_COUNT, flush_interval=STATE_FLUSH_INTERVAL):
+        """Initialise the download state of a root folder.
+        The downloads file is read once, and lookups are answered from an index keyed by
+        course ID and lecture URL. Changes are written in batches.
+
+        Arguments:
+            root_folder {str} -- The destination folder selected for the downloads
+
+        Keyword Arguments:
+            flush_count {int} -- Number of changes after which the state is written to disk (default: {STATE_FLUSH_COUNT})
+            flush_interval {float} -- Seconds after which pending changes are written to disk (default: {STATE_FLUSH_INTERVAL})
+        """
+        self.root_folder = root_folder
+        self.path = Path(root_folder, DOWNLOAD_DATA)
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.data = {"version": DOWNLOAD_DATA_VERSION, "courses": {}}
+        self.index = {}
+        self.pending = 0
+        self.last_flush = time.time()
+        self._load()
+
+    def _load(self):
+        """Read the downloads file and build the index.
+        A downloads file written by older versions, having the courses at the top level, is migrated.
+        """
+        if not self.path.exists():
+            return
+
+        with self.path.open() as file:
+            data = json.load(file)
+
+        if "version" not in data:
+            logger.debug("Migrating %s to version %d", str(self.path), DOWNLOAD_DATA_VERSION)
+            self.data["courses"] = data
+            self.pending = 1
+        else:
+            self.data = data
+
+        for course_id, course_data in self.data["courses"].items():
+            for section in course_data.get("sections", {}).values():
+                for subsection in section.values():
+                    for lecture_url, lecture_data in subsection.items():
+                        self.index[(course_id, lecture_url)] = lecture_data
+
+        if self.pending:
+            self.flush()
+
+    def is_downloaded(self, course_id, lecture_url):
+        """Check whether the lecture has already been downloaded
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            lecture_url {str} -- URL of the lecture page
+        """
+        with self.lock:
+            return self.index.get((course_id, lecture_url), {}).get("downloaded", False)
+
+    def save_lecture(self, course_id, section, subsection, course, lecture):
+        """Record the state of the lecture. It's written to disk with the next batch.
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            section {str} -- Section of the lecture
+            subsection {str} -- Subsection of the lecture
+            course {Course} -- Selected Course object having all its details
+            lecture {Lecture} -- Lecture object having all its details
+        """
+        with self.lock:
+            lecture_data = lecture.get_dict()
+            course_data = self.data["courses"].setdefault(course_id, {"name": course.name, "sections": {}})
+            course_data.setdefault("sections", {}).setdefault(section, {}) \
+                       .setdefault(subsection, {})[lecture.url] = lecture_data
+            self.index[(course_id, lecture.url)] = lecture_data
+            self.pending = self.pending + 1
+
+            if (self.pending >= self.flush_count
+                    or time.time() - self.last_flush >= self.flush_interval):
+                self.flush()
+
+    def claim_lecture(self, course_id, lecture_url):
+        """Claim the lecture before downloading it. The downloads file can't be shared between processes,
+        so it only checks that the lecture isn't downloaded yet.
+
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            lecture_url {str} -- URL of the lecture page
+        """
+        return not self.is_downloaded(course_id, lecture_url)
+
+    def release_claims(self):
+        """Nothing to do, since lectures aren't claimed in the downloads file
+        """
+        pass
+
+    def flush(self):
+        """Write pending changes to the downloads file.
+        The data is written to a temporary file which then replaces the downloads file,
+        so a crash never leaves a partially written file behind.
+        """
+        with self.lock:
+            if not self.pending:
+                return
+
+            os.makedirs(str(self.root_folder), exist_ok=True)
+            temporary_path = Path(str(self.path) + ".tmp")
+            with temporary_path.open(mode="w") as file:
+                json.dump(self.data, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(str(temporary_path), str(self.path))
+            self.pending = 0
+            self.last_flush = time.time()
@@ -1,12 +1,23 @@
 import requests
 from bs4 import BeautifulSoup
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import re
-
-from constants import VIDEO, PROBLEM, OTHER, YOUTUBE_URL_PART
-
-from entities import Course, Lecture
+from urllib.parse import urlsplit
+import time
+
+from constants import (CACHE_FOLDER, LECTURE_CACHE_TTL, LXML_PARSER,
+                       MEDIA_BURST, MEDIA_MAX_RATE, MEDIA_RATE,
+                       OUTLINE_CACHE_SIZE, OUTLINE_CACHE_TTL, OUTLINE_WORKERS,
+                       PAGE_BURST, PAGE_MAX_RATE, PAGE_RATE, PARSE_PROCESSES,
+                       RETRY_STATUSES)
+
+import page_parser
+import parse_pool
+import rate_limiter
+from cache import LectureCache, OutlineCache
+from entities import Course, CourseResult, Lecture
+from retry import Retrier
 
 import logging
 logging.getLogger("requests").setLevel(logging.WARNING)
@@ -16,6 +27,10 @@ logger.setLevel(logging.DEBUG)
 
 
 class EdXDownloader(object):
+
+    # Errors of page requests which are worth another try
+    RETRY_ON = (requests.ConnectionError, requests.Timeout)
+
     def __init__(self, configuration):
         """Initialise the downloader for edX
         
@@ -26,8 +41,66 @@ class EdXDownloader(object):
         self.website_urls = self.configuration.get_website_urls("edX")
         self.session = requests.Session()
         self.session.headers = self.configuration.get_website_headers("edX")
+        self.timeout = self.configuration.get_request_timeout()
+        self.session.mount("http://", rate_limiter.RateLimitedAdapter())
+        self.session.mount("https://", rate_limiter.RateLimitedAdapter())
+        self.rate_limiter = rate_limiter.configure(
+            page_hosts=[urlsplit(url).netloc for url in self.website_urls.values()],
+            page_rate=self.configuration.get_download_setting("page_rate", PAGE_RATE),
+            page_max_rate=self.configuration.get_download_setting("page_max_rate", PAGE_MAX_RATE),
+            page_burst=self.configuration.get_download_setting("page_burst", PAGE_BURST),
+            media_rate=self.configuration.get_download_setting("media_rate", MEDIA_RATE),
+            media_max_rate=self.configuration.get_download_setting("media_max_rate", MEDIA_MAX_RATE),
+            media_burst=self.configuration.get_download_setting("media_burst", MEDIA_BURST))
+        self.retrier = Retrier.from_configuration(self.configuration, self.RETRY_ON)
         self.courses = {}
         self.lectures = OrderedDict()
+        self.lecture_courses = {}
+        parser_name = self.configuration.get_download_setting("parser", LXML_PARSER)
+        self.parser = page_parser.get_parser(parser_name)
+        parse_processes = self.configuration.get_download_setting("parse_processes", PARSE_PROCESSES)
+        self.parse_pool = None
+        if parse_processes > 0:
+            self.parse_pool = parse_pool.configure(processes=parse_processes, parser_name=parser_name)
+        cache_folder = self.configuration.get_download_setting("cache_folder", str(Path.home() / CACHE_FOLDER))
+        self.outline_cache = None
+        if self.configuration.get_download_setting("outline_cache", True):
+            self.outline_cache = OutlineCache(
+                cache_folder,
+                ttl=self.configuration.get_download_setting("outline_cache_ttl", OUTLINE_CACHE_TTL),
+                max_size=self.configuration.get_download_setting("outline_cache_size", OUTLINE_CACHE_SIZE))
+        self.lecture_cache = None
+        if self.configuration.get_download_setting("lecture_cache", True):
+            self.lecture_cache = LectureCache(
+                cache_folder, ttl=self.configuration.get_download_setting("lecture_cache_ttl", LECTURE_CACHE_TTL))
+
+    def _get_page(self, url, headers=None):
+        """Fetch a page of the website. Only this request is tried again if it fails,
+        with backoff, honouring Retry-After and the circuit breaker of the host.
+        
+        Arguments:
+            url {str} -- URL of the page
+        
+        Keyword Arguments:
+            headers {dict} -- Extra headers of the request (default: {None})
+        """
+        return self.retrier.call(url, lambda: self._request_page(url, headers=headers))
+
+    def _request_page(self, url, headers=None):
+        """Make a single request for a page using the logged in session
+        
+        Arguments:
+            url {str} -- URL of the page
+        
+        Keyword Arguments:
+            headers {dict} -- Extra headers of the request (default: {None})
+        """
+        return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def close(self):
+        """Close the connections of the downloader
+        """
+        self.session.close()
 
     def login(self, username, password):
         """Login to the edX website
@@ -39,12 +112,13 @@ class EdXDownloader(object):
         self.username = username
         self.password = password
         login_successful = False
-        login_request = self.session.get(self.website_urls["first_url"])
+        login_request = self.session.get(self.website_urls["first_url"], timeout=self.timeout)
 
         if(login_request.status_code == 200):
             csrf_token = login_request.cookies["csrftoken"]
             login_request = self.session.post(self.website_urls["login_url"], data={
-                                              "email": username, "password": password}, headers={"X-CSRFToken": csrf_token})
+                                              "email": username, "password": password}, headers={"X-CSRFToken": csrf_token},
+                                              timeout=self.timeout)
             if (login_request.status_code == 200):
                 login_successful = self.get_course_list()
             else:
@@ -56,8 +130,21 @@ class EdXDownloader(object):
     def get_course_list(self):
         """After logging in, go to user's dashboard and get links to all the courses present
         """
-        dashboard = self.session.get(self.website_urls["dashboard_url"])
-        self.home_page = BeautifulSoup(dashboard.text, 'html.parser')
+        dashboard = self._get_page(self.website_urls["dashboard_url"])
+        self._parse_course_list(dashboard.text)
+
+        if dashboard.status_code == 200:
+            return True
+
+        return False
+
+    def _parse_course_list(self, text):
+        """Parse the dashboard and add the courses present to the course list
+        
+        Arguments:
+            text {str} -- HTML of the dashboard page
+        """
+        self.home_page = BeautifulSoup(text, 'html.parser')
 
         for course_details in self.home_page.select(".wrapper-course-details"):
             course_link = course_details.find(
@@ -85,130 +172,240 @@ class EdXDownloader(object):
 
             self.courses[course_link["data-course-key"]] = course
 
-        if dashboard.status_code == 200:
-            return True
-
-        return False
-
-    def get_course_lectures(self, courses):
-        """Get all the lectures associated with the selected courses
+    def get_course_lectures(self, courses, cancelled=None, on_course_retrieved=None):
+        """Get all the lectures associated with the selected courses.
+        The outlines are fetched concurrently, with at most 'outline_workers' courses at a time.
+        Outlines retrieved earlier are revalidated with a conditional request, and reused if unchanged.
+        A course which fails doesn't stop the others. Returns a dictionary of course IDs and their
+        CourseResult, in the order of the courses.
         
         Arguments:
             courses {Set} -- Set of course IDs
+        
+        Keyword Arguments:
+            cancelled {function} -- Returns True when retrieving should be stopped (default: {None})
+            on_course_retrieved {function} -- Called with the CourseResult of each course as soon as it's done,
+                                              from the calling thread (default: {None})
         """
-        for course_id in courses:
-            url = self.courses[course_id].url
-            course_request = self.session.get(url)
-
-            if course_request.status_code != 200:
-                return False
-
-            course_page = BeautifulSoup(course_request.text, 'html.parser')
-            course_outline = OrderedDict()
-
-            for section in course_page.select("#course-outline-block-tree .section"):
-                section_title = section.find(attrs={"class": "section-title"}) \
-                    .string.strip()
-                
-                if section_title is None:
+        courses = list(courses)
+        results = OrderedDict((course_id, CourseResult(course_id, False, reason="Cancelled"))
+                              for course_id in courses)
+        if not courses:
+            return results
+
+        workers = self.configuration.get_download_setting("outline_workers", OUTLINE_WORKERS)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(courses)))) as executor:
+            futures = {executor.submit(self._get_course_outline, course_id, cancelled): course_id
+                       for course_id in courses}
+            for future in as_completed(futures):
+                course_id = futures[future]
+                course_outline, reason = future.result()
+                if course_outline is None and reason is None:
+                    # Cancelled before it was fetched
                     continue
 
-                course_outline[section_title] = OrderedDict()
-                logger.debug("Section name: %s", section_title)
-
-                for subsection in section.select(".subsection"):
-                    subsection_title = subsection.find(
-                        attrs={"class": "subsection-title"}).string.strip()
-
-                    if subsection_title is None:
-                        continue
-
-                    course_outline[section_title][subsection_title] = OrderedDict()
-                    logger.debug("Subsection name: %s", subsection_title)
-
-                    for lecture in subsection.select('a.outline-item'):
-                        lecture_title = lecture.find(
-                            attrs={"class": "vertical-title"}).string.strip()
+                if course_outline is not None:
+                    self._add_course_outline(course_id, course_outline)
+                    results[course_id] = CourseResult(course_id, True)
+                else:
+                    logger.error("Couldn't retrieve the outline of %s: %s", course_id, reason)
+                    results[course_id] = CourseResult(course_id, False, reason=reason)
+                if on_course_retrieved is not None:
+                    on_course_retrieved(results[course_id])
+
+        return results
+
+    def _get_course_outline(self, course_id, cancelled=None):
+        """Fetch and parse the outline of a course. Runs on the outline workers.
+        Returns a tuple of the outline and the reason it couldn't be retrieved,
+        with None for both if retrieving was cancelled.
+        
+        Arguments:
+            course_id {str} -- Unique ID/key of the course
+        
+        Keyword Arguments:
+            cancelled {function} -- Returns True when retrieving should be stopped (default: {None})
+        """
+        if cancelled is not None and cancelled():
+            return None, None
+
+        url = self.courses[course_id].url
+        cached = self.outline_cache.get(course_id) if self.outline_cache is not None else None
+        headers = {}
+        if cached is not None and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            course_request = self._get_page(url, headers=headers)
+        except Exception as error:
+            return None, str(error) or type(error).__name__
+
+        if cached is not None and course_request.status_code == 304:
+            logger.debug("Outline of %s not modified, using cache", course_id)
+            self.outline_cache.revalidated(course_id, cached)
+            return cached["outline"], None
+        elif course_request.status_code != 200:
+            return None, "{status_code} {reason}".format(
+                status_code=course_request.status_code, reason=course_request.reason or "").strip()
+
+        digest = OutlineCache.get_digest(course_request.text)
+        if cached is not None and cached["digest"] == digest:
+            logger.debug("Outline of %s unchanged, using cache", course_id)
+            course_outline = cached["outline"]
+        else:
+            try:
+                course_outline = self._parse_course_outline(course_request.text)
+            except Exception as error:
+                return None, "Couldn't parse the outline: " + (str(error) or type(error).__name__)
+            # The page also changes with its tokens, so the lectures are only dropped when the outline itself changed
+            if self.lecture_cache is not None and (cached is None or cached["outline"] != course_outline):
+                self.lecture_cache.invalidate_course(course_id)
+        if self.outline_cache is not None:
+            self.outline_cache.put(course_id, course_outline, etag=course_request.headers.get("etag"),
+                                   last_modified=course_request.headers.get("last-modified"),
+                                   digest=digest)
+        return course_outline, None
+
+    def _add_course_outline(self, course_id, course_outline):
+        """Save the outline of the course and add its lectures. Runs on the calling thread,
+        so the lectures are only changed from one thread.
+        
+        Arguments:
+            course_id {str} -- Unique ID/key of the course
+            course_outline {OrderedDict} -- The course structure having sections, subsections and lectures
+        """
+        for section in course_outline.values():
+            for subsection in section.values():
+                for lecture_url, lecture_title in subsection.items():
+                    self.lectures[lecture_url] = Lecture(
+                        title=lecture_title, url=lecture_url, downloaded=False)
+                    self.lecture_courses[lecture_url] = course_id
+
+        self.courses[course_id].course_outline = course_outline
+
+    def _parse_course_outline(self, text):
+        """Parse the course outline page into sections, subsections and lectures.
+        If enabled, it's parsed in the pool of parser processes.
+        
+        Arguments:
+            text {str} -- HTML of the course outline page
+        """
+        start_time = time.time()
+        course_outline = None
+        if self.parse_pool is not None:
+            try:
+                course_outline = self.parse_pool.parse_course_outline(text)
+            except Exception as error:
+                logger.error("Parser process failed, parsing in this process: %s", error)
+        if course_outline is None:
+            course_outline = self.parser.parse_course_outline(text)
+        logger.debug("Parsed course outline in %.1f ms", (time.time() - start_time) * 1000)
+        return course_outline
 
-                        if lecture_title is None:
-                            continue
+    def get_lecture_details(self, lecture_title, lecture_url):
+        """Get details of a particular lecture.
+        Lectures resolved on earlier runs are taken from the lecture cache without fetching the page.
+        
+        Arguments:
+            lecture_title {str} -- Title of the lecture
+            lecture_url {str} -- URL of the lecture
+        """
+        lecture = self._get_cached_lecture(lecture_title, lecture_url)
+        if lecture is not None:
+            return lecture
 
-                        lecture_url = lecture["href"]
-                        course_outline[section_title][subsection_title][lecture_url] = lecture_title
-                        self.lectures[lecture_url] = Lecture(
-                            title=lecture_title, downloaded=False)
-                        logger.debug(
-                            "Lecture name: %s , Lecture url: %s", lecture_title, lecture_url)
+        lecture_request = self._get_page(lecture_url)
 
-            self.courses[course_id].course_outline = course_outline
+        if lecture_request.status_code in RETRY_STATUSES:
+            # Still failing after all the tries, so report it instead of skipping the lecture
+            raise requests.HTTPError("{status_code} {reason} for {url}".format(
+                status_code=lecture_request.status_code, reason=lecture_request.reason or "", url=lecture_url))
+        if lecture_request.status_code != 200:
+            return None
 
-        return True
+        return self._save_lecture(self._parse_lecture_page(lecture_title, lecture_url, lecture_request.text))
 
-    def get_lecture_details(self, lecture_title, lecture_url):
-        """Get details of a rticular lecture
+    def refresh_lecture_details(self, lecture_title, lecture_url):
+        """Get the details of the lecture from its page again, after the cached ones stopped working,
+        like a download URL which expired
         
         Arguments:
             lecture_title {str} -- Title of the lecture
             lecture_url {str} -- URL of the lecture
         """
-        lecture_request = self.session.get(lecture_url)
+        if self.lecture_cache is not None:
+            self.lecture_cache.invalidate(lecture_url)
+        return self.get_lecture_details(lecture_title, lecture_url)
 
-        if lecture_request.status_code != 200:
+    def _get_cached_lecture(self, lecture_title, lecture_url):
+        """Get the lecture from the lecture cache, or None if it isn't cached
+        
+        Arguments:
+            lecture_title {str} -- Title of the lecture
+            lecture_url {str} -- URL of the lecture
+        """
+        cached = self.lecture_cache.get(lecture_url) if self.lecture_cache is not None else None
+        if cached is None:
             return None
 
-        lecture_page = BeautifulSoup(lecture_request.text, 'html.parser')
+        lecture = Lecture(lecture_title, lecture_url, downloaded=False, media_type=cached["media_type"],
+                          download_url=cached["download_url"], from_youtube=cached["from_youtube"], path=None)
+        logger.debug("Lecture from cache: %s", str(lecture))
+        self.lectures[lecture_url] = lecture
+        return lecture
+
+    def _parse_lecture_page(self, lecture_title, lecture_url, text):
+        """Parse the lecture page to find the type of the lecture and the URL of its video.
+        If enabled, it's parsed in the pool of parser processes, so pages resolved by
+        different threads are parsed in parallel.
+        
+        Arguments:
+            lecture_title {str} -- Title of the lecture
+            lecture_url {str} -- URL of the lecture
+            text {str} -- HTML of the lecture page
+        """
+        start_time = time.time()
         data_id = lecture_url.split("/jump_to/")[-1]
-        lecture_classes = lecture_page.find(
-            attrs={"data-id": data_id})
-            
-        if lecture_classes is None:
+        if self.parse_pool is not None:
+            try:
+                details = self.parse_pool.parse_lecture_page(text, data_id)
+            except Exception as error:
+                logger.error("Parser process failed, parsing in this process: %s", error)
+                details = self.parser.parse_lecture_page(text, data_id)
+        else:
+            details = self.parser.parse_lecture_page(text, data_id)
+        logger.debug("Parsed lecture page in %.1f ms", (time.time() - start_time) * 1000)
+
+        if details is None:
             return None
-            
-        lecture_classes = lecture_classes["class"]
-
-        youtube_url = False
-        download_url = None
-
-        if VIDEO in lecture_classes:
-            lecture_type = VIDEO
-            lecture_inner = BeautifulSoup(
-                lecture_page.findAll(attrs={"class": "xblock"})[0].text, 'html.parser')
-
-            if lecture_inner is None:
-                return None
-
-            course_xblock = lecture_inner.find(attrs={"data-usage-id": data_id}) 
-            if course_xblock == None:
-                course_xblock = lecture_inner.find(attrs={"data-usage-id": data_id.replace('/', ';_')})
-            
-            if course_xblock is None:
-                return None
-
-            download_url = course_xblock.select_one(".video-download-button")
-            youtube_url = False
-            if (download_url == None):
-                youtube_regex = re.compile(r'streams.*#34[\s\S]*?#34;1.\d*\:(.*?)&#34')
-                download_url = re.search(youtube_regex, lecture_page.findAll(attrs={"class": "xblock"})[0].text)
-                if not download_url is None:
-                    download_url = YOUTUBE_URL_PART + download_url.group(1)
-                    youtube_url = True
-            else:
-                download_url = download_url["href"]
 
-            if download_url is None:
-                return None
+        lecture_type, download_url, youtube_url = details
+        return Lecture(lecture_title, lecture_url, downloaded=False, media_type=lecture_type,
+                       download_url=download_url, from_youtube=youtube_url, path=None)
 
-        elif PROBLEM in lecture_classes:
-            lecture_type = PROBLEM
-        else:
-            lecture_type = OTHER
+    def _save_lecture(self, lecture):
+        """Store the resolved lecture, and add it to the lecture cache
+        
+        Arguments:
+            lecture {Lecture} -- The resolved lecture, or None if it couldn't be resolved
+        """
+        if lecture is None:
+            return None
 
-        lecture = Lecture(lecture_title, lecture_url, downloaded=False, media_type=lecture_type,
-                          download_url=download_url, from_youtube=youtube_url, path=None)
         logger.debug("Lecture: %s", str(lecture))
-        self.lectures[lecture_url] = lecture
+        self.lectures[lecture.url] = lecture
+        if self.lecture_cache is not None:
+            self.lecture_cache.put(lecture, course_key=self.lecture_courses.get(lecture.url))
 
-        return self.lectures[lecture_url]
+        return self.lectures[lecture.url]
+
+    def save_cache(self):
+        """Write the pending changes of the lecture cache to disk
+        """
+        if self.lecture_cache is not None:
+            self.lecture_cache.flush()
 
     def set_lecture_downloaded(self, lecture_url, downloaded=True):
         """Set the particular lecture as downloaded
@@ -82,3 +82,49 @@ class Lecture(object):
             title=self.title, url=self.url, downloaded=self.downloaded, media_type=self.media_type,
             download_url=self.download_url, from_youtube=self.from_youtube, path=self.path
         ))
+
+
+class CourseResult(object):
+    def __init__(self, course_id, successful, reason=None):
+        """Initialise the result of retrieving the outline of a course
+        
+        Arguments:
+            course_id {str} -- Unique ID/key of the course
+            successful {bool} -- Flag to indicate whether the outline was retrieved
+        
+        Keyword Arguments:
+            reason {str} -- Why the outline couldn't be retrieved (default: {None})
+        """
+        self.course_id = course_id
+        self.successful = successful
+        self.reason = reason
+
+    def __str__(self):
+        return ("CourseResult(course_id={course_id} ,successful={successful} ,reason={reason})".format(
+            course_id=self.course_id, successful=self.successful, reason=self.reason
+        ))
+
+
+class LectureJob(object):
+    def __init__(self, course_id, section, subsection, lecture_url, lecture_title, path):
+        """Initialise a unit of work for the download scheduler
+        
+        Arguments:
+            course_id {str} -- Course ID of the lecture
+            section {str} -- Section of the lecture
+            subsection {str} -- Subsection of the lecture
+            lecture_url {str} -- URL of the lecture page
+            lecture_title {str} -- Title of the lecture, prefixed with its index
+            path {Path} -- Folder to which the lecture will be downloaded
+        """
+        self.course_id = course_id
+        self.section = section
+        self.subsection = subsection
+        self.lecture_url = lecture_url
+        self.lecture_title = lecture_title
+        self.path = path
+
+    def __str__(self):
+        return ("LectureJob(course_id={course_id} ,lecture_url={lecture_url} ,lecture_title={lecture_title})".format(
+            course_id=self.course_id, lecture_url=self.lecture_url, lecture_title=self.lecture_title
+        ))
@@ -0,0 +1,49 @@
+import logging
+
+from PyQt5.QtCore import QElapsedTimer, QObject, QTimer
+
+from constants import LATENCY_CHECK_INTERVAL, LATENCY_WARNING_THRESHOLD
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class EventLoopMonitor(QObject):
+    def __init__(self, parent=None, interval=LATENCY_CHECK_INTERVAL, threshold=LATENCY_WARNING_THRESHOLD):
+        """Initialise the monitor of the GUI event loop latency.
+        A timer is scheduled at a fixed interval, and any delay in it firing is time the event loop was blocked.
+
+        Keyword Arguments:
+            parent {QObject} -- The parent QObject (default: {None})
+            interval {int} -- Milliseconds between two checks (default: {LATENCY_CHECK_INTERVAL})
+            threshold {int} -- Latency in milliseconds above which a warning is logged (default: {LATENCY_WARNING_THRESHOLD})
+        """
+        super().__init__(parent)
+        self.interval = interval
+        self.threshold = threshold
+        self.last_latency = 0
+        self.max_latency = 0
+        self.clock = QElapsedTimer()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._check)
+
+    def start(self):
+        """Start measuring the latency
+        """
+        self.clock.start()
+        self.timer.start()
+
+    def stop(self):
+        """Stop measuring and log the maximum latency seen
+        """
+        self.timer.stop()
+        logger.info("Maximum event loop latency: %d ms", self.max_latency)
+
+    def _check(self):
+        """Measure how late the timer fired
+        """
+        self.last_latency = max(self.clock.restart() - self.interval, 0)
+        self.max_latency = max(self.max_latency, self.last_latency)
+        if self.last_latency >= self.threshold:
+            logger.warning("Event loop was blocked for %d ms", self.last_latency)
@@ -0,0 +1,108 @@
+import logging
+import threading
+
+import requests
+
+from constants import (CONNECT_TIMEOUT, MEDIA_POOL_CONNECTIONS, MEDIA_POOL_MAXSIZE,
+                       READ_TIMEOUT)
+from rate_limiter import RateLimitedAdapter
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class MediaClient(object):
+    def __init__(self, cookies=None, pool_connections=MEDIA_POOL_CONNECTIONS, pool_maxsize=MEDIA_POOL_MAXSIZE,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        """Initialise the pooled HTTP client used for media downloads.
+        Connections are kept alive and reused across lectures, instead of opening new ones for every request.
+
+        Keyword Arguments:
+            cookies {RequestsCookieJar} -- Cookie jar shared with the downloader session (default: {None})
+            pool_connections {int} -- Number of hosts whose connections are kept (default: {MEDIA_POOL_CONNECTIONS})
+            pool_maxsize {int} -- Maximum number of connections to a single host (default: {MEDIA_POOL_MAXSIZE})
+            timeout {tuple} -- Seconds to wait for a connection and for the next bytes of a response (default: {(CONNECT_TIMEOUT, READ_TIMEOUT)})
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.session = requests.Session()
+        if cookies is not None:
+            self.session.cookies = cookies
+        # Block instead of opening extra connections, so that the per host limit is never exceeded.
+        # Requests are paced by the shared rate limiter
+        self.adapter = RateLimitedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def get(self, url, **kwargs):
+        """Make a GET request with the timeout of the client
+
+        Arguments:
+            url {str} -- URL of the request
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        """Make a HEAD request with the timeout of the client
+
+        Arguments:
+            url {str} -- URL of the request
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.head(url, **kwargs)
+
+    def log_stats(self):
+        """Log the number of connections opened and requests made to each host
+        """
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            logger.info("Connection pool %s://%s:%s - %d connections opened, %d requests",
+                        pool.scheme, pool.host, pool.port, pool.num_connections, pool.num_requests)
+
+    def close(self):
+        """Close all the connections of the client
+        """
+        self.session.close()
+
+
+def configure(cookies=None, pool_connections=MEDIA_POOL_CONNECTIONS, pool_maxsize=MEDIA_POOL_MAXSIZE,
+              timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+    """Set up the shared media client. The existing client is kept if its settings are the same,
+    so that its open connections are reused.
+
+    Keyword Arguments:
+        cookies {RequestsCookieJar} -- Cookie jar shared with the downloader session (default: {None})
+        pool_connections {int} -- Number of hosts whose connections are kept (default: {MEDIA_POOL_CONNECTIONS})
+        pool_maxsize {int} -- Maximum number of connections to a single host (default: {MEDIA_POOL_MAXSIZE})
+        timeout {tuple} -- Seconds to wait for a connection and for the next bytes of a response (default: {(CONNECT_TIMEOUT, READ_TIMEOUT)})
+    """
+    global _client
+    with _client_lock:
+        if (_client is not None and (cookies is None or _client.session.cookies is cookies)
+                and _client.pool_connections == pool_connections and _client.pool_maxsize == pool_maxsize):
+            # The timeout doesn't affect the open connections
+            _client.timeout = timeout
+            return _client
+
+        if _client is not None:
+            _client.close()
+        _client = MediaClient(cookies=cookies, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              timeout=timeout)
+        return _client
+
+
+def get_client():
+    """Get the shared media client, creating one with the default settings if needed
+    """
+    with _client_lock:
+        if _client is not None:
+            return _client
+    return configure()
@@ -0,0 +1,30 @@
+import itertools
+import threading
+
+_job_ids = itertools.count(1)
+
+
+class Job(object):
+    def __init__(self, name):
+        """Initialise the handle of work done by the session, like logging in or downloading.
+        It can be cancelled from any thread, and the work checks it between steps.
+
+        Arguments:
+            name {str} -- Name of the job, used in logs
+        """
+        self.id = next(_job_ids)
+        self.name = name
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Ask the job to stop. Steps already in progress are allowed to finish.
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        """Check whether the job was cancelled
+        """
+        return self._cancelled.is_set()
+
+    def __str__(self):
+        return "Job(id={id} ,name={name})".format(id=self.id, name=self.name)
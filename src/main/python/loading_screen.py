@@ -1,11 +1,17 @@
-from PyQt5.QtCore import QByteArray, Qt
+from PyQt5.QtCore import QByteArray, Qt, pyqtSignal
 from PyQt5.QtGui import QMovie
-from PyQt5.QtWidgets import QDialog, QLabel, QVBoxLayout
+from PyQt5.QtWidgets import QDialog, QLabel, QPushButton, QVBoxLayout
+
+from constants import CANCEL_LABEL
 
 
 class LoadingScreen(QDialog):
+
+    cancelled = pyqtSignal()
+
     def __init__(self, parent, file_path, text):
-        """Initialise the loading screen
+        """Initialise the loading screen. It isn't modal, so the window keeps handling events
+        while the work is done on the session thread, and it can be cancelled.
         
         Arguments:
             parent {QObject} -- The parent QObject
@@ -17,7 +23,7 @@ class LoadingScreen(QDialog):
         self.text = text
         self.setWindowFlag(Qt.FramelessWindowHint)
         self.setFixedSize(200, 200)
-        self.setModal(True)
+        self.setModal(False)
         self.init_UI()
 
     def init_UI(self):
@@ -38,9 +44,12 @@ class LoadingScreen(QDialog):
 
         self.loading = QLabel(self.text)
         self.loading.setAlignment(Qt.AlignCenter)
+        self.cancel_button = QPushButton(CANCEL_LABEL, self)
+        self.cancel_button.clicked.connect(self.cancelled.emit)
         vbox.addStretch(2)
         vbox.addWidget(self.movie_screen, Qt.AlignCenter)
         vbox.addSpacing(10)
         vbox.addWidget(self.loading, Qt.AlignHCenter)
         vbox.addStretch(1)
+        vbox.addWidget(self.cancel_button, Qt.AlignHCenter)
         self.setLayout(vbox)
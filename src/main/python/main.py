@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from fbs_runtime.application_context import ApplicationContext
@@ -16,6 +17,8 @@ class AppContext(ApplicationContext):           # 1. Subclass ApplicationContext
 
 
 if __name__ == '__main__':
+    # Needed by the parser processes in frozen builds
+    multiprocessing.freeze_support()
     appctxt = AppContext()                      # 4. Instantiate the subclass
     exit_code = appctxt.run()                   # 5. Invoke run()
     sys.exit(exit_code)
@@ -1,6 +1,4 @@
-from functools import partial
-
-from PyQt5.QtCore import Qt, QThread
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import (QComboBox, QFileDialog, QFormLayout, QFrame,
                              QGridLayout, QGroupBox, QHBoxLayout, QLabel,
                              QLineEdit, QMainWindow, QProgressBar, QPushButton,
@@ -22,11 +20,18 @@ from constants import (APPLICATION_NAME, BROWSE_LABEL, CANCEL_LABEL,
 from course_list import CourseListView
 from course_structure import CourseStructure
 from dialog_box import MessageDialog
+from event_loop_monitor import EventLoopMonitor
 from loading_screen import LoadingScreen
 from session import Session
 
 
 class DownloaderWindow(QMainWindow):
+
+    login_requested = pyqtSignal(str, str)
+    retrieve_requested = pyqtSignal(list)
+    download_requested = pyqtSignal(list, str)
+    website_requested = pyqtSignal(str)
+
     def __init__(self, app, application_context):
         """Main downloader window
         
@@ -45,6 +50,9 @@ class DownloaderWindow(QMainWindow):
 
         self.connect_events()
 
+        self.latency_monitor = EventLoopMonitor(self)
+        self.latency_monitor.start()
+
     def init_UI(self):
         """Initialise the UI
         """
@@ -77,24 +85,27 @@ class DownloaderWindow(QMainWindow):
         self.processing_thread.start()
 
     def connect_events(self):
-        """Connect events to corresponding callbacks
+        """Connect events to corresponding callbacks.
+        Requests to the session are queued signals carrying plain data, so they run on the session thread
+        and the window never waits for the network.
         """
         self.website_input.activated[str].connect(self.website_changed)
-        self.login_btn.clicked.connect(partial(
-            self.session.login, username=self.username_input, password=self.password_input))
+        self.login_btn.clicked.connect(self.login_pressed)
         self.root_folder_path_button.clicked.connect(self.get_root_folder)
+        self.action_button.clicked.connect(self.action_button_clicked)
+        self.cancel_button.clicked.connect(self.cancel_pressed)
+        self.loading_screen.cancelled.connect(self.loading_cancelled)
+        self.login_requested.connect(self.session.login, Qt.QueuedConnection)
+        self.retrieve_requested.connect(self.session.retrieve_course_details, Qt.QueuedConnection)
+        self.download_requested.connect(self.session.download_courses, Qt.QueuedConnection)
+        self.website_requested.connect(self.session.change_website, Qt.QueuedConnection)
         self.session.login_successful.connect(self.login_successful)
+        self.session.course_retrieved.connect(self.course_retrieved)
         self.session.courses_retrieved.connect(self.courses_retrieved)
-        self.action_button.clicked.connect(partial(self.session.action_button_clicked, self.course_list, 
-                                                    self.action_button, self.root_folder_path_input))
-        self.cancel_button.clicked.connect(self.cancel_pressed)
-        self.session.loading_screen.connect(self.show_loading_screen)
-        self.session.clear_course_list.connect(self.course_list.clear_all)
-        self.session.clear_course_structure.connect(self.course_structure.clear)
         self.session.courses_downloaded.connect(self.courses_downloaded)
         self.session.download_progress.connect(self.download_progress)
-        self.session.destination_required.connect(self.raise_error_dialog)
-        self.session.course_selection_required.connect(self.raise_error_dialog)
+        self.session.download_stats.connect(self.download_stats)
+        self.session.lectures_changed.connect(self.course_structure.update_lecture_status)
 
     def show_loading_screen(self, show):
         """Show or close the loading screen
@@ -259,8 +270,10 @@ class DownloaderWindow(QMainWindow):
         self.progressbar = QProgressBar(groupbox)
         self.progressbar.setMaximum(PROGRESSBAR_MAXIMUM)
         self.progressbar.setMinimum(PROGRESSBAR_MINIMUM)
+        self.progress_stats_label = QLabel(groupbox)
         vbox = QVBoxLayout()
         vbox.addWidget(self.progressbar)
+        vbox.addWidget(self.progress_stats_label)
         groupbox.setLayout(vbox)
         self.grid.addWidget(groupbox, 11, 0, 1, 12)
 
@@ -272,19 +285,62 @@ class DownloaderWindow(QMainWindow):
             website_name {str} -- Name of the website chosen
         """
         self.website_url_input.setText(self.website_url_map[website_name])
-        self.session.change_website(website_name)
+        self.website_requested.emit(website_name)
+
+    def login_pressed(self):
+        """Callback when the Login button is pressed
+        Show the loading screen and ask the session to login
+        """
+        self.course_list.clear_all()
+        self.login_btn.setDisabled(True)
+        self.show_loading_screen(True)
+        self.login_requested.emit(self.username_input.text(), self.password_input.text())
 
-    def login_successful(self, successful):
+    def action_button_clicked(self):
+        """Callback when the Retrieve courses or Download courses button is clicked
+        """
+        selected_courses = list(self.course_list.selected_courses)
+        if(str(self.action_button.text()) == RETRIEVE_COURSES_LABEL and len(selected_courses) > 0):
+            self.action_button.setDisabled(True)
+            self.course_structure.clear()
+            self.show_loading_screen(True)
+            self.retrieve_requested.emit(selected_courses)
+        elif(str(self.action_button.text()) == RETRIEVE_COURSES_LABEL):
+            self.raise_error_dialog('Select course(s)',
+                                    'Atleast one course has to be selected before trying to retrieve.', CRITICAL)
+        elif(str(self.action_button.text()) == DOWNLOAD_COURSES_LABEL and self.root_folder_path_input.text() != ""):
+            self.action_button.setDisabled(True)
+            # Only the courses whose outlines were retrieved are downloaded
+            retrieved_courses = [course.data_course_key for course in self.course_structure.courses]
+            self.download_requested.emit(retrieved_courses, self.root_folder_path_input.text())
+        elif(str(self.action_button.text()) == DOWNLOAD_COURSES_LABEL):
+            self.raise_error_dialog(
+                'Select a root folder', 'Destination folder required before downloading.', CRITICAL)
+
+    def loading_cancelled(self):
+        """Callback when the Cancel button of the loading screen is pressed.
+        The login or retrieval is cancelled, and its result will be ignored when it arrives.
+        """
+        self.session.cancel_pressed()
+        self.show_loading_screen(False)
+        self.login_btn.setEnabled(True)
+        self.action_button.setText(RETRIEVE_COURSES_LABEL)
+        self.action_button.setEnabled(True)
+
+    def login_successful(self, successful, courses):
         """Callback when the Login successful event is raised
         If successful, add the retrieved courses to the UI, else raise Login unsucessful error dialog
 
         Arguments:
             successful {boolean} -- Boolean indicating whether login was successful or not
+            courses {list} -- The courses of the user
         """
+        self.show_loading_screen(False)
+        self.login_btn.setEnabled(True)
         if successful:
             self.action_button.setText(RETRIEVE_COURSES_LABEL)
-            for _, details in self.session.downloader.courses.items():
-                self.course_list.add_course(details)
+            for course in courses:
+                self.course_list.add_course(course)
         else:
             self.raise_error_dialog("Couldn't Login", "Something went wrong.",
                                     message_type=CRITICAL,
@@ -297,25 +353,35 @@ class DownloaderWindow(QMainWindow):
         self.action_button.setText(RETRIEVE_COURSES_LABEL)
 
 
-    def courses_retrieved(self, successful):
-        """Callback when the courses are retrieved
-        If successful, show the lectures associated with the courses, 
-        else show appropriate error message.
+    def course_retrieved(self, course):
+        """Callback when the outline of a course is retrieved, so that its lectures are shown
+        without waiting for the other courses
 
         Arguments:
-            successful {boolean} -- Boolean indicating whether all courses were retrieved
+            course {Course} -- The retrieved course
         """
-        if successful:
-            self.action_button.setText(DOWNLOAD_COURSES_LABEL)
-            self.action_button.setEnabled(True)
-            for course in self.session.data["selected_courses"]:
-                self.course_structure.add_course(self.session.downloader.courses[course])
-        else:
-            self.action_button.setText(RETRIEVE_COURSES_LABEL)
-            self.action_button.setEnabled(True)
-            self.raise_error_dialog('Unknown error', 'Courses couldn"t be retrieved!',
-                                    message_type=CRITICAL,
-                                    informativeText='Try again after checking network conditions')
+        self.course_structure.add_course(course)
+
+    def courses_retrieved(self, courses, failures):
+        """Callback when all the selected courses are retrieved or have failed.
+        If any course was retrieved, its lectures can be downloaded.
+        The courses which failed are shown with the reason in an error message.
+
+        Arguments:
+            courses {list} -- The retrieved courses
+            failures {list} -- The CourseResult of each course which couldn't be retrieved
+        """
+        self.show_loading_screen(False)
+        self.action_button.setText(DOWNLOAD_COURSES_LABEL if courses else RETRIEVE_COURSES_LABEL)
+        self.action_button.setEnabled(True)
+        if failures:
+            details = "\n".join("{course_id}: {reason}".format(course_id=failure.course_id, reason=failure.reason)
+                                 for failure in failures)
+            self.raise_error_dialog('Unknown error',
+                                    'Courses couldn"t be retrieved!' if not courses else
+                                    '{count} course(s) couldn"t be retrieved!'.format(count=len(failures)),
+                                    message_type=CRITICAL if not courses else WARNING,
+                                    informativeText='Try again after checking network conditions\n\n' + details)
         
         
     def courses_downloaded(self, successful):
@@ -350,14 +416,21 @@ class DownloaderWindow(QMainWindow):
         self.root_folder_path_input.setText(file)
 
     def download_progress(self, fraction_completed):
-        """Callback when a video download is completed, so that progress bar can be updated
-        appropriately 
+        """Callback when the download progress changes, so that progress bar can be updated
+        appropriately. It's called at a limited rate, including while large files are being downloaded.
         
         Arguments:
-            fraction_completed {float} -- The fraction of total videos downloaded. (Below 1)
+            fraction_completed {float} -- The fraction of total videos downloaded, counting partially downloaded ones. (Below 1)
         """
         self.progressbar.setValue(fraction_completed*PROGRESSBAR_MAXIMUM)
-        self.course_structure.update_lecture_status(self.session.downloader.lectures)
+
+    def download_stats(self, stats):
+        """Callback with the bytes downloaded, throughput and estimated time left, to be shown below the progress bar
+        
+        Arguments:
+            stats {ProgressStats} -- Snapshot of the download progress
+        """
+        self.progress_stats_label.setText(str(stats))
 
     def cancel_pressed(self):
         """Callback when the cancel button is pressed.
@@ -366,6 +439,17 @@ class DownloaderWindow(QMainWindow):
         self.cancel_button.setText(CANCELLING_LABEL)
         self.session.cancel_pressed()
 
+    def closeEvent(self, event):
+        """Stop the latency monitor and the session thread when the window is closed
+        
+        Arguments:
+            event {QCloseEvent} -- The close event
+        """
+        self.latency_monitor.stop()
+        self.session.cancel_pressed()
+        self.processing_thread.quit()
+        super().closeEvent(event)
+
     def show_notification(self):
         """Show a notification that the Course downloader has completed all downloads
         """
@@ -0,0 +1,356 @@
+import logging
+import threading
+from pathlib import Path
+
+import requests
+import youtube_dl
+
+import http_client
+import utils
+from constants import (DOWNLOAD_CHUNK_SIZE, DOWNLOAD_SEGMENTS, DOWNLOAD_WORKERS,
+                       MEDIA_POOL_CONNECTIONS, MEDIA_POOL_MAXSIZE,
+                       PROGRESS_INTERVAL, RESOLVER_WORKERS,
+                       SEGMENT_THRESHOLD, STATE_BACKEND, VIDEO, YOUTUBE_FORMAT,
+                       YOUTUBE_WORKERS)
+from download_scheduler import DownloadScheduler
+from edx_downloader import EdXDownloader
+from entities import LectureJob
+from jobs import Job
+from progress import ProgressTracker
+from retry import FailureReport, Retrier
+from youtube_downloader import YoutubeDownloader
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def create_downloader(configuration, website_name):
+    """Create the downloader for the website. Currently only edX is supported.
+    Returns None for websites which aren't supported.
+
+    Arguments:
+        configuration {Configuration} -- Configuration object having data about website
+        website_name {str} -- Name of the website
+    """
+    if website_name != "edX":
+        return None
+    return EdXDownloader(configuration)
+
+
+class DownloadOrchestrator(object):
+
+    # Errors of media downloads which are worth another try. The part file is kept, so the next try resumes it
+    RETRY_ON = (requests.RequestException, utils.DownloadError, youtube_dl.utils.DownloadError)
+
+    def __init__(self, configuration, downloader, job=None, progress_interval=PROGRESS_INTERVAL,
+                 on_progress=None, on_lectures_changed=None, on_lecture_downloaded=None, on_lecture_failed=None):
+        """Initialise the orchestrator which downloads the lectures of the selected courses.
+        It has no GUI dependency: the GUI and the command line mode are notified through the callbacks,
+        which are called from the worker threads.
+
+        Arguments:
+            configuration {Configuration} -- Configuration object having data about website
+            downloader {EdXDownloader} -- Logged in downloader having the course outlines
+
+        Keyword Arguments:
+            job {Job} -- Job used to cancel the downloads. A new one is created if None (default: {None})
+            progress_interval {float} -- Minimum seconds between two progress reports (default: {PROGRESS_INTERVAL})
+            on_progress {function} -- Called with a ProgressStats snapshot (default: {None})
+            on_lectures_changed {function} -- Called with a dictionary of changed lecture urls and their status (default: {None})
+            on_lecture_downloaded {function} -- Called with the LectureJob of each downloaded lecture (default: {None})
+            on_lecture_failed {function} -- Called with the LectureJob and the error of each lecture which failed
+                                            after all its tries (default: {None})
+        """
+        self.configuration = configuration
+        self.downloader = downloader
+        self.job = job if job is not None else Job("download")
+        self.progress_interval = progress_interval
+        self.on_progress = on_progress
+        self.on_lectures_changed = on_lectures_changed
+        self.on_lecture_downloaded = on_lecture_downloaded
+        self.on_lecture_failed = on_lecture_failed
+        self.retrier = Retrier.from_configuration(configuration, self.RETRY_ON)
+        self.failures = FailureReport()
+        self.state_backend = configuration.get_download_setting("state_backend", STATE_BACKEND)
+        self.root_folder = None
+        self.scheduler = None
+        self.progress = None
+        self.youtube = None
+        self.changes_lock = threading.Lock()
+        self.changed_lectures = {}
+
+    def cancel(self):
+        """Stop the downloads. Part files are kept, so they can be resumed later
+        """
+        self.job.cancel()
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.cancel()
+
+    def run(self, course_keys, root_folder):
+        """Download the lecture videos of the courses.
+        Lectures are resolved and downloaded concurrently by the download scheduler, in a single pass.
+        Failed page requests and lecture downloads are tried again on their own, and the lectures which
+        still fail are added to the failure report. Returns True if every lecture was downloaded.
+
+        Arguments:
+            course_keys {list} -- Unique IDs/keys of the courses
+            root_folder {str} -- The destination folder of the downloads
+        """
+        self.root_folder = root_folder
+        download_workers = self.configuration.get_download_setting("download_workers", DOWNLOAD_WORKERS)
+        media_client = http_client.configure(
+            cookies=self.downloader.session.cookies,
+            pool_connections=self.configuration.get_download_setting("pool_connections", MEDIA_POOL_CONNECTIONS),
+            pool_maxsize=self._get_pool_maxsize(download_workers),
+            timeout=self.configuration.get_request_timeout())
+        self.youtube = YoutubeDownloader(
+            workers=self.configuration.get_download_setting("youtube_workers", YOUTUBE_WORKERS),
+            video_format=self.configuration.get_download_setting("youtube_format", YOUTUBE_FORMAT),
+            socket_timeout=self.configuration.get_request_timeout()[1])
+        lecture_jobs = self._get_lecture_jobs(course_keys, root_folder)
+        self.progress = ProgressTracker(len(lecture_jobs), self._report_progress, interval=self.progress_interval)
+        self.scheduler = DownloadScheduler(
+            resolver_workers=self.configuration.get_download_setting("resolver_workers", RESOLVER_WORKERS),
+            download_workers=download_workers)
+
+        try:
+            errors = self.scheduler.run(lecture_jobs, self._resolve_lecture, self._download_lecture,
+                                        skip=lambda job: self.progress.finish())
+        finally:
+            self.scheduler = None
+            self.progress.flush()
+            utils.flush_downloads(root_folder, backend=self.state_backend)
+            utils.release_claims(root_folder, backend=self.state_backend)
+            self.downloader.save_cache()
+            media_client.log_stats()
+            self.youtube.close()
+            self.youtube = None
+
+        if len(self.failures) > 0:
+            logger.error("%d lecture(s) failed:\n%s", len(self.failures), str(self.failures))
+        return not errors and not self.job.is_cancelled()
+
+    def _get_pool_maxsize(self, download_workers):
+        """Get the maximum number of media connections to a host. Every download holds one connection per segment
+        until all its segments are done, and the pool blocks when it's full, so a pool smaller than
+        the download workers times the segments would leave the downloads waiting for each other forever.
+
+        Arguments:
+            download_workers {int} -- Number of files transferred at a time
+        """
+        pool_maxsize = self.configuration.get_download_setting("pool_maxsize", MEDIA_POOL_MAXSIZE)
+        segments = max(1, self.configuration.get_download_setting("segments", DOWNLOAD_SEGMENTS))
+        needed = max(1, download_workers) * segments
+        if pool_maxsize < needed:
+            logger.warning("pool_maxsize %d is too small for %d download workers with %d segments each, using %d",
+                           pool_maxsize, max(1, download_workers), segments, needed)
+            return needed
+        return pool_maxsize
+
+    def _get_lecture_jobs(self, course_keys, root_folder):
+        """Get the list of lecture jobs for the courses, in course order
+
+        Arguments:
+            course_keys {list} -- Unique IDs/keys of the courses
+            root_folder {str} -- The destination folder of the downloads
+        """
+        jobs = []
+        for course_id in course_keys:
+            course_outline = self.downloader.courses[course_id].course_outline
+            for section in course_outline:
+                logger.debug("\tSection name: %s", section)
+                for subsection in course_outline[section]:
+                    lectures = course_outline[section][subsection]
+                    path = Path(root_folder, self.downloader.courses[course_id].name,
+                                section, subsection)
+                    for index, lecture_url in enumerate(lectures):
+                        lecture_title = (str(index + 1).zfill(len(str(len(lectures)))) +
+                                         "-" + lectures[lecture_url])
+                        jobs.append(LectureJob(course_id, section, subsection,
+                                               lecture_url, lecture_title, path))
+        return jobs
+
+    def _resolve_lecture(self, job):
+        """Check whether the lecture has to be downloaded, and if so get its details.
+        The downloaded state is checked first using the lecture URL from the outline, so that
+        lecture pages are fetched only for lectures which still need downloading.
+        The lecture is then claimed, so that another process sharing the root folder doesn't download it too.
+        Runs on the resolver workers of the download scheduler.
+
+        Arguments:
+            job {LectureJob} -- The lecture to be resolved
+        """
+        downloaded = utils.is_downloaded(
+            job.course_id, job.section, job.subsection, self.downloader.courses[job.course_id],
+            self.downloader.lectures[job.lecture_url], self.root_folder, backend=self.state_backend)
+
+        if not downloaded and not utils.claim_lecture(
+                job.course_id, self.downloader.lectures[job.lecture_url], self.root_folder,
+                backend=self.state_backend):
+            # Either another process sharing the root folder just downloaded it, or is downloading it
+            downloaded = utils.is_downloaded(
+                job.course_id, job.section, job.subsection, self.downloader.courses[job.course_id],
+                self.downloader.lectures[job.lecture_url], self.root_folder, backend=self.state_backend)
+            if not downloaded:
+                error = utils.DownloadError("{title} is being downloaded by another process".format(
+                    title=job.lecture_title))
+                self._lecture_failed(job, "claim", error)
+                self.progress.finish()
+                raise error
+
+        if downloaded:
+            # Only videos are saved as downloaded
+            self.downloader.set_lecture_downloaded(job.lecture_url).media_type = VIDEO
+            self._lecture_changed(job.lecture_url)
+            self.progress.finish()
+            return None
+
+        try:
+            lecture = self.downloader.get_lecture_details(job.lecture_title, job.lecture_url)
+        except Exception as error:
+            self._lecture_failed(job, "resolve", error)
+            self.progress.finish()
+            raise
+        if lecture is not None:
+            self._lecture_changed(job.lecture_url)
+
+        if lecture is not None and lecture.media_type == VIDEO:
+            if lecture.from_youtube:
+                # Extract the video information while other lectures are being downloaded
+                self.youtube.prefetch(lecture.download_url)
+            return self.downloader.set_lecture_path(job.lecture_url, job.path)
+
+        self.progress.finish()
+        return None
+
+    def _download_lecture(self, job, lecture):
+        """Download the lecture video and save the download state.
+        If the download fails, the lecture is resolved again in case its download URL expired,
+        and downloaded once more if the URL changed.
+        Runs on the download workers of the download scheduler.
+
+        Arguments:
+            job {LectureJob} -- The lecture job being downloaded
+            lecture {Lecture} -- The resolved lecture having the download url and path
+        """
+        try:
+            try:
+                successful = self._download(job, lecture)
+            except Exception as error:
+                self._lecture_failed(job, "download", error)
+                raise
+            if not successful:
+                return
+
+            lecture = self.downloader.set_lecture_downloaded(job.lecture_url)
+            self._lecture_changed(job.lecture_url)
+            utils.save_downloads(
+                job.course_id, job.section, job.subsection, self.downloader.courses[job.course_id],
+                lecture, self.root_folder, backend=self.state_backend)
+            if self.on_lecture_downloaded is not None:
+                self.on_lecture_downloaded(job)
+        finally:
+            self.progress.finish(job.lecture_url)
+
+    def _download(self, job, lecture):
+        """Download the lecture video. If it fails, it's downloaded once more if resolving the lecture again
+        gives a new download URL. Returns False if it was cancelled.
+
+        Arguments:
+            job {LectureJob} -- The lecture job being downloaded
+            lecture {Lecture} -- The resolved lecture having the download url and path
+        """
+        try:
+            return self._transfer(job, lecture)
+        except Exception as error:
+            if self.job.is_cancelled():
+                raise
+            lecture = self._resolve_again(job, lecture, error)
+        return self._transfer(job, lecture)
+
+    def _transfer(self, job, lecture):
+        """Download the lecture video, trying only it again if it fails, resuming from its part file.
+        Returns False if it was cancelled.
+
+        Arguments:
+            job {LectureJob} -- The lecture job being downloaded
+            lecture {Lecture} -- The resolved lecture having the download url and path
+        """
+        def _download():
+            return utils.download_lecture(
+                lecture,
+                chunk_size=self.configuration.get_download_setting("chunk_size", DOWNLOAD_CHUNK_SIZE),
+                segments=self.configuration.get_download_setting("segments", DOWNLOAD_SEGMENTS),
+                segment_threshold=self.configuration.get_download_setting("segment_threshold", SEGMENT_THRESHOLD),
+                cancelled=self.job.is_cancelled,
+                youtube=self.youtube,
+                progress=lambda downloaded, total: self.progress.update(job.lecture_url, downloaded, total))
+
+        successful = self.retrier.call(lecture.download_url, _download, cancelled=self.job.is_cancelled)
+        if not successful and not self.job.is_cancelled():
+            raise utils.DownloadError("Couldn't download " + lecture.title)
+        return successful
+
+    def _resolve_again(self, job, lecture, error):
+        """Resolve the lecture again from its page, without the lecture cache, after its download failed.
+        Returns the lecture if its download URL changed, otherwise the download error is raised.
+
+        Arguments:
+            job {LectureJob} -- The lecture job being downloaded
+            lecture {Lecture} -- The lecture whose download failed
+            error {Exception} -- The error of the download
+        """
+        try:
+            refreshed = self.downloader.refresh_lecture_details(job.lecture_title, job.lecture_url)
+        except Exception as resolve_error:
+            logger.error("Couldn't resolve %s again: %s", job.lecture_title, resolve_error)
+            raise error
+
+        if refreshed is None or refreshed.media_type != VIDEO or refreshed.download_url == lecture.download_url:
+            raise error
+        logger.info("Download URL of %s changed, downloading it again", job.lecture_title)
+        self._lecture_changed(job.lecture_url)
+        if refreshed.from_youtube:
+            self.youtube.prefetch(refreshed.download_url)
+        return self.downloader.set_lecture_path(job.lecture_url, job.path)
+
+    def _lecture_failed(self, job, stage, error):
+        """Add the lecture which failed after all its tries to the failure report.
+        Errors caused by cancelling aren't reported.
+
+        Arguments:
+            job {LectureJob} -- The lecture job which failed
+            stage {str} -- What was being done: 'claim', 'resolve' or 'download'
+            error {Exception} -- The error of the last try
+        """
+        if self.job.is_cancelled():
+            return
+        self.failures.add(str(job), stage, error)
+        if self.on_lecture_failed is not None:
+            self.on_lecture_failed(job, error)
+
+    def _report_progress(self, stats):
+        """Report the download progress, along with the lectures which changed since the last report.
+        Called by the progress tracker at a limited rate.
+
+        Arguments:
+            stats {ProgressStats} -- Snapshot of the download progress
+        """
+        with self.changes_lock:
+            changed_lectures = self.changed_lectures
+            self.changed_lectures = {}
+        if changed_lectures and self.on_lectures_changed is not None:
+            self.on_lectures_changed(changed_lectures)
+        if self.on_progress is not None:
+            self.on_progress(stats)
+
+    def _lecture_changed(self, lecture_url):
+        """Record the new status of a lecture. The changes are sent along with the next progress report,
+        so that only the lectures which changed are updated, a few times a second.
+
+        Arguments:
+            lecture_url {str} -- URL of the lecture
+        """
+        with self.changes_lock:
+            self.changed_lectures[lecture_url] = self.downloader.lectures[lecture_url].status
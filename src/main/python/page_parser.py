@@ -0,0 +1,340 @@
+import logging
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from constants import (HTML_PARSER, LXML_PARSER, OTHER, PROBLEM,
+                       TARGETED_PARSER, VIDEO, YOUTUBE_URL_PART)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+YOUTUBE_REGEX = re.compile(r'streams.*#34[\s\S]*?#34;1.\d*\:(.*?)&#34')
+
+# Elements which have no end tag, so they're never pushed on the stack of open elements
+VOID_ELEMENTS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+                           "meta", "param", "source", "track", "wbr"])
+
+
+def _has_class(class_name):
+    """XPath condition matching elements having the class among their classes
+
+    Arguments:
+        class_name {str} -- Name of the class
+    """
+    return 'contains(concat(" ", normalize-space(@class), " "), " {class_name} ")'.format(class_name=class_name)
+
+
+def _find_youtube_url(xblock_text):
+    """Find the YouTube video in the streams attribute of the xblock
+
+    Arguments:
+        xblock_text {str} -- Text of the xblock having the video
+    """
+    match = re.search(YOUTUBE_REGEX, xblock_text)
+    if match is None:
+        return None
+    return YOUTUBE_URL_PART + match.group(1)
+
+
+class _OutlineBuilder(object):
+    def __init__(self):
+        """Initialise the builder which gets the events of the course outline page in a single pass,
+        and builds the sections, subsections and lectures as their elements are closed.
+        Sections, subsections and lectures without a title are skipped.
+        It's used as the target of the lxml parser, or fed by _OutlineHTMLParser.
+        """
+        self.course_outline = OrderedDict()
+        # Open elements, as lists of the tag name and the parts of the outline they start
+        self.open_elements = []
+        self.in_tree = False
+        self.section = None
+        self.subsection = None
+        self.lecture = None
+        self.title_parts = None
+
+    def start(self, tag, attrib):
+        attributes = dict(attrib)
+        classes = (attributes.get("class") or "").split()
+        roles = []
+
+        if not self.in_tree:
+            if attributes.get("id") == "course-outline-block-tree":
+                self.in_tree = True
+                roles.append("tree")
+        elif "section" in classes and self.section is None:
+            self.section = {"title": None, "subsections": []}
+            roles.append("section")
+        elif "subsection" in classes and self.section is not None and self.subsection is None:
+            self.subsection = {"title": None, "lectures": OrderedDict()}
+            roles.append("subsection")
+        elif (tag == "a" and "outline-item" in classes
+              and self.subsection is not None and self.lecture is None):
+            self.lecture = {"title": None, "url": attributes.get("href")}
+            roles.append("lecture")
+
+        if self.title_parts is None and self._starts_title(classes):
+            self.title_parts = []
+            roles.append("title")
+
+        if tag not in VOID_ELEMENTS:
+            self.open_elements.append((tag, roles))
+
+    def end(self, tag):
+        # Unclosed elements inside the closed one are closed along with it
+        for position in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[position][0] == tag:
+                while len(self.open_elements) > position:
+                    self._close(self.open_elements.pop()[1])
+                return
+
+    def data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+
+    def close(self):
+        while self.open_elements:
+            self._close(self.open_elements.pop()[1])
+        return self.course_outline
+
+    def _starts_title(self, classes):
+        """Whether the element is the title of the innermost open section, subsection or lecture
+
+        Arguments:
+            classes {list} -- Classes of the element
+        """
+        if self.lecture is not None:
+            return self.lecture["title"] is None and "vertical-title" in classes
+        if self.subsection is not None:
+            return self.subsection["title"] is None and "subsection-title" in classes
+        if self.section is not None:
+            return self.section["title"] is None and "section-title" in classes
+        return False
+
+    def _close(self, roles):
+        """Finish the parts of the outline started by the closed element, innermost first
+
+        Arguments:
+            roles {list} -- Parts of the outline started by the element
+        """
+        for role in reversed(roles):
+            if role == "title":
+                title = "".join(self.title_parts).strip()
+                self.title_parts = None
+                owner = self.lecture or self.subsection or self.section
+                owner["title"] = title or None
+            elif role == "lecture":
+                lecture, self.lecture = self.lecture, None
+                if lecture["title"] is not None and lecture["url"] is not None:
+                    self.subsection["lectures"][lecture["url"]] = lecture["title"]
+            elif role == "subsection":
+                subsection, self.subsection = self.subsection, None
+                if subsection["title"] is not None:
+                    self.section["subsections"].append((subsection["title"], subsection["lectures"]))
+            elif role == "section":
+                section, self.section = self.section, None
+                if section["title"] is not None:
+                    self._add_section(section)
+            elif role == "tree":
+                self.in_tree = False
+
+    def _add_section(self, section):
+        """Add the finished section to the course outline
+
+        Arguments:
+            section {dict} -- Title of the section and its list of subsections
+        """
+        logger.debug("Section name: %s", section["title"])
+        subsections = OrderedDict()
+        for subsection_title, lectures in section["subsections"]:
+            logger.debug("Subsection name: %s", subsection_title)
+            for lecture_url, lecture_title in lectures.items():
+                logger.debug("Lecture name: %s , Lecture url: %s", lecture_title, lecture_url)
+            subsections[subsection_title] = lectures
+        self.course_outline[section["title"]] = subsections
+
+
+class _OutlineHTMLParser(HTMLParser):
+    def __init__(self, builder):
+        """Initialise the parser which feeds the course outline builder when lxml isn't installed
+
+        Arguments:
+            builder {_OutlineBuilder} -- The builder getting the events of the page
+        """
+        super().__init__()
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+    def close(self):
+        super().close()
+        return self.builder.close()
+
+
+def parse_course_outline(text):
+    """Parse the course outline page into sections, subsections and lectures in a single pass
+    over the document, without building a tree of the page. It's used by all the parser backends.
+    The page is tokenized by lxml if it's installed, otherwise by the standard library.
+
+    Arguments:
+        text {str} -- HTML of the course outline page
+    """
+    builder = _OutlineBuilder()
+    if lxml is not None:
+        parser = lxml.etree.HTMLParser(target=builder)
+    else:
+        parser = _OutlineHTMLParser(builder)
+    parser.feed(text)
+    return parser.close()
+
+
+class SoupParser(object):
+    def __init__(self, features=HTML_PARSER):
+        """Initialise the parser which builds BeautifulSoup trees of the pages
+
+        Keyword Arguments:
+            features {str} -- The tree builder used by BeautifulSoup, 'html.parser' or 'lxml' (default: {HTML_PARSER})
+        """
+        self.features = features
+
+    def parse_course_outline(self, text):
+        """Parse the course outline page into sections, subsections and lectures
+
+        Arguments:
+            text {str} -- HTML of the course outline page
+        """
+        return parse_course_outline(text)
+
+    def parse_lecture_page(self, text, data_id):
+        """Parse the lecture page to find the type of the lecture and the URL of its video.
+        Returns a tuple of lecture type, download URL and whether it's a YouTube URL,
+        or None if the lecture couldn't be found.
+
+        Arguments:
+            text {str} -- HTML of the lecture page
+            data_id {str} -- ID of the lecture block
+        """
+        lecture_page = BeautifulSoup(text, self.features)
+        lecture_classes = lecture_page.find(attrs={"data-id": data_id})
+
+        if lecture_classes is None:
+            return None
+
+        lecture_classes = lecture_classes["class"]
+
+        if VIDEO not in lecture_classes:
+            return (PROBLEM if PROBLEM in lecture_classes else OTHER), None, False
+
+        xblock = lecture_page.find(attrs={"class": "xblock"})
+        if xblock is None:
+            return None
+        xblock_text = xblock.text
+        lecture_inner = BeautifulSoup(xblock_text, self.features)
+
+        course_xblock = lecture_inner.find(attrs={"data-usage-id": data_id})
+        if course_xblock is None:
+            course_xblock = lecture_inner.find(attrs={"data-usage-id": data_id.replace('/', ';_')})
+
+        if course_xblock is None:
+            return None
+
+        download_button = course_xblock.select_one(".video-download-button")
+        if download_button is not None:
+            return VIDEO, download_button["href"], False
+
+        youtube_url = _find_youtube_url(xblock_text)
+        if youtube_url is None:
+            return None
+        return VIDEO, youtube_url, True
+
+
+class TargetedParser(object):
+    """Parser which uses lxml directly, and only looks up the nodes needed with XPath
+    instead of building and searching BeautifulSoup trees.
+    """
+
+    def parse_course_outline(self, text):
+        """Parse the course outline page into sections, subsections and lectures
+
+        Arguments:
+            text {str} -- HTML of the course outline page
+        """
+        return parse_course_outline(text)
+
+    def parse_lecture_page(self, text, data_id):
+        """Parse the lecture page to find the type of the lecture and the URL of its video.
+        Returns a tuple of lecture type, download URL and whether it's a YouTube URL,
+        or None if the lecture couldn't be found.
+
+        Arguments:
+            text {str} -- HTML of the lecture page
+            data_id {str} -- ID of the lecture block
+        """
+        lecture_page = lxml.html.fromstring(text)
+        lecture_block = lecture_page.xpath('//*[@data-id=$data_id]', data_id=data_id)
+
+        if not lecture_block:
+            return None
+
+        lecture_classes = lecture_block[0].get("class", "").split()
+
+        if VIDEO not in lecture_classes:
+            return (PROBLEM if PROBLEM in lecture_classes else OTHER), None, False
+
+        xblock = lecture_page.xpath('//*[{condition}]'.format(condition=_has_class("xblock")))
+        if not xblock:
+            return None
+        xblock_text = xblock[0].text_content()
+
+        if xblock_text.strip():
+            lecture_inner = lxml.html.fromstring(xblock_text)
+            course_xblock = lecture_inner.xpath('//*[@data-usage-id=$data_id or @data-usage-id=$escaped_id]',
+                                                data_id=data_id, escaped_id=data_id.replace('/', ';_'))
+        else:
+            course_xblock = []
+
+        if not course_xblock:
+            return None
+
+        download_button = course_xblock[0].xpath('.//*[{condition}]/@href'.format(
+            condition=_has_class("video-download-button")))
+        if download_button:
+            return VIDEO, download_button[0], False
+
+        youtube_url = _find_youtube_url(xblock_text)
+        if youtube_url is None:
+            return None
+        return VIDEO, youtube_url, True
+
+
+def get_parser(name):
+    """Get the parser backend with the name.
+    Falls back to the BeautifulSoup 'html.parser' backend if lxml isn't installed.
+
+    Arguments:
+        name {str} -- Name of the backend: HTML_PARSER, LXML_PARSER or TARGETED_PARSER
+    """
+    if name in (LXML_PARSER, TARGETED_PARSER) and lxml is None:
+        logger.debug("lxml is not installed, using %s to parse pages", HTML_PARSER)
+        name = HTML_PARSER
+
+    if name == TARGETED_PARSER:
+        return TargetedParser()
+    elif name == LXML_PARSER:
+        return SoupParser(LXML_PARSER)
+    return SoupParser(HTML_PARSER)
@@ -0,0 +1,145 @@
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import page_parser
+from constants import LXML_PARSER, PARSE_PROCESSES
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Parsers created in each worker process, by backend name
+_parsers = {}
+
+
+def _get_parser(parser_name):
+    """Get the parser of the worker process, creating it the first time
+
+    Arguments:
+        parser_name {str} -- Name of the parser backend
+    """
+    if parser_name not in _parsers:
+        _parsers[parser_name] = page_parser.get_parser(parser_name)
+    return _parsers[parser_name]
+
+
+def _start_worker():
+    """Do nothing in a worker process, submitted to start the workers
+    """
+    return None
+
+
+def parse_course_outline(parser_name, text):
+    """Parse the course outline page in a worker process
+
+    Arguments:
+        parser_name {str} -- Name of the parser backend
+        text {str} -- HTML of the course outline page
+    """
+    return _get_parser(parser_name).parse_course_outline(text)
+
+
+def parse_lecture_page(parser_name, text, data_id):
+    """Parse the lecture page in a worker process. Only the tuple of lecture type,
+    download URL and whether it's a YouTube URL is sent back.
+
+    Arguments:
+        parser_name {str} -- Name of the parser backend
+        text {str} -- HTML of the lecture page
+        data_id {str} -- ID of the lecture block
+    """
+    return _get_parser(parser_name).parse_lecture_page(text, data_id)
+
+
+class ParsePool(object):
+    def __init__(self, processes=PARSE_PROCESSES, parser_name=LXML_PARSER):
+        """Initialise the pool of processes which parse pages, so that parsing isn't limited to one core by the GIL.
+        The processes are kept running and reused for all pages.
+        They are spawned instead of forked, since forking a process while other threads hold locks,
+        like the Qt threads of the application, can deadlock the child. This needs Python 3.7, see is_supported.
+
+        Keyword Arguments:
+            processes {int} -- Number of worker processes (default: {PARSE_PROCESSES})
+            parser_name {str} -- Name of the parser backend used by the workers (default: {LXML_PARSER})
+        """
+        self.processes = processes
+        self.parser_name = parser_name
+        self.executor = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        """Start the worker processes and wait for them, instead of having them started by the first page
+        """
+        futures = [self.executor.submit(_start_worker) for _ in range(self.processes)]
+        for future in futures:
+            future.result()
+
+    def parse_course_outline(self, text):
+        """Parse the course outline page in a worker process, and wait for the result
+
+        Arguments:
+            text {str} -- HTML of the course outline page
+        """
+        return self.executor.submit(parse_course_outline, self.parser_name, text).result()
+
+    def parse_lecture_page(self, text, data_id):
+        """Parse the lecture page in a worker process, and wait for the result
+
+        Arguments:
+            text {str} -- HTML of the lecture page
+            data_id {str} -- ID of the lecture block
+        """
+        return self.executor.submit(parse_lecture_page, self.parser_name, text, data_id).result()
+
+    def close(self):
+        """Stop the worker processes
+        """
+        self.executor.shutdown(wait=False)
+
+
+def is_supported():
+    """Check whether the worker processes can be spawned. ProcessPoolExecutor only takes
+    a multiprocessing context from Python 3.7, and before that it always forks.
+    """
+    return sys.version_info >= (3, 7)
+
+
+def configure(processes=PARSE_PROCESSES, parser_name=LXML_PARSER):
+    """Set up the shared parse pool. The existing pool is kept if its settings are the same,
+    so that its processes stay warm across courses and downloaders.
+    A new pool's processes are started right away, before the downloader starts its worker threads.
+    Returns None if the processes can't be spawned on this Python version, and pages are then parsed in-process.
+
+    Keyword Arguments:
+        processes {int} -- Number of worker processes (default: {PARSE_PROCESSES})
+        parser_name {str} -- Name of the parser backend used by the workers (default: {LXML_PARSER})
+    """
+    global _pool
+    if not is_supported():
+        logger.warning("Parser processes need Python 3.7 or later, parsing pages in-process instead")
+        return None
+
+    with _pool_lock:
+        if _pool is not None and _pool.processes == processes and _pool.parser_name == parser_name:
+            return _pool
+
+        if _pool is not None:
+            _pool.close()
+        logger.debug("Starting %d parser processes", processes)
+        _pool = ParsePool(processes=processes, parser_name=parser_name)
+        _pool.start()
+        return _pool
+
+
+def shutdown():
+    """Stop the shared parse pool, if it was started
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
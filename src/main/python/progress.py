@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+
+from constants import PROGRESS_INTERVAL, PROGRESS_SMOOTHING
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def format_size(size):
+    """Format a number of bytes to be shown to the user, like '12.3 MB'
+
+    Arguments:
+        size {float} -- Number of bytes
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return "{size:.1f} {unit}".format(size=size, unit=unit)
+        size = size / 1024
+    return "{size:.1f} TB".format(size=size)
+
+
+def format_duration(seconds):
+    """Format a duration to be shown to the user, like '1h 02m' or '3m 20s'
+
+    Arguments:
+        seconds {float} -- The duration in seconds
+    """
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "{hours}h {minutes:02d}m".format(hours=seconds // 3600, minutes=seconds % 3600 // 60)
+    if seconds >= 60:
+        return "{minutes}m {seconds:02d}s".format(minutes=seconds // 60, seconds=seconds % 60)
+    return "{seconds}s".format(seconds=seconds)
+
+
+class ProgressStats(object):
+    def __init__(self, fraction, downloaded_bytes, speed, eta, active_files):
+        """Initialise a snapshot of the download progress
+
+        Arguments:
+            fraction {float} -- Fraction of the lectures processed, counting partially downloaded files (Below 1)
+            downloaded_bytes {int} -- Number of bytes transferred in this run
+            speed {float} -- Smoothed throughput in bytes per second
+            eta {float} -- Estimated seconds left, or None if it can't be estimated yet
+            active_files {int} -- Number of files being downloaded
+        """
+        self.fraction = fraction
+        self.downloaded_bytes = downloaded_bytes
+        self.speed = speed
+        self.eta = eta
+        self.active_files = active_files
+
+    def __str__(self):
+        text = "{downloaded} downloaded, {speed}/s".format(
+            downloaded=format_size(self.downloaded_bytes), speed=format_size(self.speed))
+        if self.eta is not None:
+            text = text + ", {eta} left".format(eta=format_duration(self.eta))
+        return text
+
+
+class ProgressTracker(object):
+    def __init__(self, total_lectures, callback, interval=PROGRESS_INTERVAL, smoothing=PROGRESS_SMOOTHING):
+        """Initialise the tracker of the bytes transferred by all downloads.
+        Updates come from many download threads, and are coalesced so that the callback
+        is called at most once per interval.
+
+        Arguments:
+            total_lectures {int} -- Number of lectures in the run
+            callback {function} -- Called with a ProgressStats snapshot
+
+        Keyword Arguments:
+            interval {float} -- Minimum seconds between two calls of the callback (default: {PROGRESS_INTERVAL})
+            smoothing {float} -- Weight of the latest sample in the moving average of the throughput (default: {PROGRESS_SMOOTHING})
+        """
+        self.total_lectures = max(1, total_lectures)
+        self.callback = callback
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.files = {}
+        self.finished = 0
+        self.finished_bytes = 0
+        self.finished_files = 0
+        self.transferred = 0
+        self.speed = 0.0
+        self.sample_time = time.time()
+        self.sample_bytes = 0
+        self.emitted_at = 0.0
+
+    def update(self, key, downloaded, total=None):
+        """Record the number of bytes downloaded of a file
+
+        Arguments:
+            key {str} -- Unique key of the file, like the lecture URL
+            downloaded {int} -- Number of bytes of the file downloaded so far
+
+        Keyword Arguments:
+            total {int} -- Size of the file in bytes, or None if it's unknown (default: {None})
+        """
+        with self.lock:
+            previous = self.files.get(key)
+            if previous is not None:
+                # A file being started over counts from zero again
+                self.transferred = self.transferred + max(downloaded - previous[0], 0)
+            self.files[key] = (downloaded, total)
+        self._emit()
+
+    def finish(self, key=None):
+        """Count a lecture as processed, whether it was downloaded or skipped
+
+        Keyword Arguments:
+            key {str} -- Unique key of the file, if it was being downloaded (default: {None})
+        """
+        with self.lock:
+            self.finished = self.finished + 1
+            downloaded, total = self.files.pop(key, (0, None))
+            if downloaded:
+                self.finished_bytes = self.finished_bytes + (total or downloaded)
+                self.finished_files = self.finished_files + 1
+        self._emit(force=self.finished == self.total_lectures)
+
+    def flush(self):
+        """Call the callback with the latest progress, regardless of the interval
+        """
+        self._emit(force=True)
+
+    def _snapshot(self, now):
+        """Get the current progress, and update the throughput average. Called with the lock held.
+
+        Arguments:
+            now {float} -- The current time
+        """
+        elapsed = now - self.sample_time
+        if elapsed > 0:
+            rate = (self.transferred - self.sample_bytes) / elapsed
+            self.speed = rate if not self.speed else self.smoothing * rate + (1 - self.smoothing) * self.speed
+            self.sample_time = now
+            self.sample_bytes = self.transferred
+
+        partial = sum(min(downloaded / total, 1.0) for downloaded, total in self.files.values() if total)
+        fraction = min((self.finished + partial) / self.total_lectures, 1.0)
+
+        eta = None
+        if self.speed > 0:
+            remaining = sum(total - downloaded for downloaded, total in self.files.values()
+                            if total and total > downloaded)
+            pending = self.total_lectures - self.finished - len(self.files)
+            if pending > 0 and self.finished_files:
+                # Lectures not started yet are assumed to be as large as the ones finished
+                remaining = remaining + pending * self.finished_bytes / self.finished_files
+            eta = remaining / self.speed
+
+        return ProgressStats(fraction, self.transferred, self.speed, eta, len(self.files))
+
+    def _emit(self, force=False):
+        """Call the callback if the interval has passed since the last call
+
+        Keyword Arguments:
+            force {bool} -- Call it even if the interval hasn't passed (default: {False})
+        """
+        now = time.time()
+        with self.lock:
+            if not force and now - self.emitted_at < self.interval:
+                return
+            self.emitted_at = now
+            stats = self._snapshot(now)
+        self.callback(stats)
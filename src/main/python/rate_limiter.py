@@ -0,0 +1,193 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from constants import (MEDIA_BURST, MEDIA_MAX_RATE, MEDIA_RATE, PAGE_BURST,
+                       PAGE_MAX_RATE, PAGE_RATE, RATE_DECREASE,
+                       RATE_INCREASE, RATE_MIN, THROTTLE_STATUSES)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class TokenBucket(object):
+    def __init__(self, name, rate, max_rate, burst):
+        """Initialise the token bucket pacing the requests of a budget.
+        The rate adapts to the server: it's halved when requests are throttled,
+        and creeps back up with every successful response, up to the maximum rate.
+
+        Arguments:
+            name {str} -- Name of the budget, used in logs
+            rate {float} -- Requests per second to start with
+            max_rate {float} -- Maximum requests per second
+            burst {int} -- Number of requests which can be made at once after being idle
+        """
+        self.name = name
+        self.rate = rate
+        self.max_rate = max(rate, max_rate)
+        self.burst = max(1, burst)
+        self.lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.throttled_at = None
+
+    def take(self):
+        """Take a token for a request if there is one. Returns 0 if it was taken,
+        otherwise the seconds until the next token at the current rate
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens = self.tokens - 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Wait until a request can be made. Returns the time it was let through,
+        to be passed back with its response
+        """
+        delay = self.take()
+        while delay > 0:
+            # Checked again after waiting, since the rate may have changed and other requests compete for the token
+            time.sleep(delay)
+            delay = self.take()
+        return time.monotonic()
+
+    def record_success(self):
+        """Increase the rate a little after a successful response.
+        The step is divided by the rate, so the rate grows by about RATE_INCREASE every second whatever it is.
+        """
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE / self.rate)
+
+    def record_throttled(self, sent_at):
+        """Halve the rate after the server throttled a request, and drop the saved up burst.
+        Requests sent before the last decrease were sent at the old rate, so their throttled responses are ignored.
+
+        Arguments:
+            sent_at {float} -- Time the request was let through, as returned by acquire
+        """
+        with self.lock:
+            if self.throttled_at is not None and sent_at < self.throttled_at:
+                return
+            self.throttled_at = time.monotonic()
+            self.tokens = min(self.tokens, 0.0)
+            self.rate = max(RATE_MIN, self.rate * RATE_DECREASE)
+            logger.info("Requests to %s throttled, slowing down to %.2f requests/s", self.name, self.rate)
+
+
+class RateLimiter(object):
+    def __init__(self, page_hosts=(), page_rate=PAGE_RATE, page_max_rate=PAGE_MAX_RATE, page_burst=PAGE_BURST,
+                 media_rate=MEDIA_RATE, media_max_rate=MEDIA_MAX_RATE, media_burst=MEDIA_BURST):
+        """Initialise the rate limiter shared by all outgoing requests.
+        Pages of the website share one budget, and each media host has a budget of its own.
+
+        Keyword Arguments:
+            page_hosts {tuple} -- Hosts of the website whose pages are scraped (default: {()})
+            page_rate {float} -- Page requests per second to start with (default: {PAGE_RATE})
+            page_max_rate {float} -- Maximum page requests per second (default: {PAGE_MAX_RATE})
+            page_burst {int} -- Page requests which can be made at once (default: {PAGE_BURST})
+            media_rate {float} -- Requests per second to each media host to start with (default: {MEDIA_RATE})
+            media_max_rate {float} -- Maximum requests per second to each media host (default: {MEDIA_MAX_RATE})
+            media_burst {int} -- Requests which can be made at once to each media host (default: {MEDIA_BURST})
+        """
+        self.page_hosts = frozenset(page_hosts)
+        self.settings = (page_rate, page_max_rate, page_burst, media_rate, media_max_rate, media_burst)
+        self.media_rate = media_rate
+        self.media_max_rate = media_max_rate
+        self.media_burst = media_burst
+        self.page_bucket = TokenBucket("pages", page_rate, page_max_rate, page_burst)
+        self.media_buckets = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, url):
+        """Get the token bucket of the budget the URL belongs to
+
+        Arguments:
+            url {str} -- URL of the request
+        """
+        host = urlsplit(url).netloc
+        if host in self.page_hosts:
+            return self.page_bucket
+        with self.lock:
+            bucket = self.media_buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(host, self.media_rate, self.media_max_rate, self.media_burst)
+                self.media_buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """Wait until a request can be made to the URL. Returns the time it was let through
+
+        Arguments:
+            url {str} -- URL of the request
+        """
+        return self.get_bucket(url).acquire()
+
+    def record(self, url, status_code, sent_at):
+        """Adapt the rate of the budget to the status of the response
+
+        Arguments:
+            url {str} -- URL of the request
+            status_code {int} -- HTTP status code of the response
+            sent_at {float} -- Time the request was let through, as returned by acquire
+        """
+        if status_code in THROTTLE_STATUSES:
+            self.get_bucket(url).record_throttled(sent_at)
+        elif status_code < 500:
+            self.get_bucket(url).record_success()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Transport adapter which paces every request sent by a requests session, including each redirect,
+    with the shared rate limiter.
+    """
+
+    def send(self, request, **kwargs):
+        limiter = get_limiter()
+        sent_at = limiter.acquire(request.url)
+        response = super().send(request, **kwargs)
+        limiter.record(request.url, response.status_code, sent_at)
+        return response
+
+
+def configure(page_hosts=(), page_rate=PAGE_RATE, page_max_rate=PAGE_MAX_RATE, page_burst=PAGE_BURST,
+              media_rate=MEDIA_RATE, media_max_rate=MEDIA_MAX_RATE, media_burst=MEDIA_BURST):
+    """Set up the shared rate limiter. The existing one is kept if its settings are the same,
+    so that the rates it adapted to aren't lost.
+
+    Keyword Arguments:
+        page_hosts {tuple} -- Hosts of the website whose pages are scraped (default: {()})
+        page_rate {float} -- Page requests per second to start with (default: {PAGE_RATE})
+        page_max_rate {float} -- Maximum page requests per second (default: {PAGE_MAX_RATE})
+        page_burst {int} -- Page requests which can be made at once (default: {PAGE_BURST})
+        media_rate {float} -- Requests per second to each media host to start with (default: {MEDIA_RATE})
+        media_max_rate {float} -- Maximum requests per second to each media host (default: {MEDIA_MAX_RATE})
+        media_burst {int} -- Requests which can be made at once to each media host (default: {MEDIA_BURST})
+    """
+    global _limiter
+    settings = (page_rate, page_max_rate, page_burst, media_rate, media_max_rate, media_burst)
+    with _limiter_lock:
+        if (_limiter is not None and _limiter.page_hosts == frozenset(page_hosts)
+                and _limiter.settings == settings):
+            return _limiter
+
+        _limiter = RateLimiter(page_hosts, *settings)
+        return _limiter
+
+
+def get_limiter():
+    """Get the shared rate limiter, creating one with the default settings if needed
+    """
+    with _limiter_lock:
+        if _limiter is not None:
+            return _limiter
+    return configure()
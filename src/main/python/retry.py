@@ -0,0 +1,340 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from constants import (CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT,
+                       CIRCUIT_TRIAL_POLL, RETRY_AFTER_LIMIT, RETRY_BASE_DELAY, RETRY_LIMIT,
+                       RETRY_MAX_DELAY, RETRY_STATUSES)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised when a host stayed unavailable for as long as a call waits for its circuit to close
+    """
+    pass
+
+
+def parse_retry_after(value):
+    """Get the seconds to wait from a Retry-After header, which is either a number of seconds or an HTTP date.
+    Returns None if the header is missing or can't be parsed.
+
+    Arguments:
+        value {str} -- Value of the Retry-After header
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+def _get_retry_after(response):
+    """Get the seconds to wait asked for by the response, if any
+
+    Arguments:
+        response {Response} -- The HTTP response, or None
+    """
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    return parse_retry_after(headers.get("retry-after"))
+
+
+class CircuitBreaker(object):
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        """Initialise the circuit breaker of a host. A failure is a call which used up all its tries,
+        so a single URL which keeps failing doesn't count for more than one.
+        After too many failed calls in a row the circuit opens, and new calls to the host wait until
+        the reset timeout has passed. Then one call is let through, which closes the circuit if it succeeds.
+
+        Arguments:
+            host {str} -- Host whose requests are guarded
+
+        Keyword Arguments:
+            failure_threshold {int} -- Failed calls in a row which open the circuit (default: {CIRCUIT_FAILURE_THRESHOLD})
+            reset_timeout {float} -- Seconds the circuit stays open (default: {CIRCUIT_RESET_TIMEOUT})
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def allow(self):
+        """Check whether a call can be made to the host. Returns a tuple of the seconds to wait before asking again,
+        0 if the call can be made, and whether the call is the trial of a half open circuit
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0, False
+            remaining = self.opened_at + self.reset_timeout - time.time()
+            if remaining <= 0 and not self.trial_running:
+                # Half open: let a single call find out whether the host recovered
+                self.trial_running = True
+                return 0.0, True
+            return (remaining if remaining > 0 else CIRCUIT_TRIAL_POLL), False
+
+    def record_success(self):
+        """Close the circuit after a successful call
+        """
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info("Circuit of %s closed", self.host)
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self, trial=False):
+        """Count a call which used up all its tries, opening the circuit when the threshold is reached
+        or when the trial of a half open circuit failed
+
+        Keyword Arguments:
+            trial {bool} -- Whether the call was the trial of a half open circuit (default: {False})
+        """
+        with self.lock:
+            self.failures = self.failures + 1
+            if trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.error("Circuit of %s opened after %d failed calls", self.host, self.failures)
+                self.opened_at = time.time()
+            if trial:
+                self.trial_running = False
+
+    def release(self, trial):
+        """Let another call be the trial, when the trial ended without telling whether the host recovered,
+        like an unexpected error or cancelling
+
+        Arguments:
+            trial {bool} -- Whether the call was the trial of a half open circuit
+        """
+        if trial:
+            with self.lock:
+                self.trial_running = False
+
+
+def get_circuit_breaker(host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+    """Get the circuit breaker of the host, shared by page and media requests
+
+    Arguments:
+        host {str} -- Host whose requests are guarded
+
+    Keyword Arguments:
+        failure_threshold {int} -- Failures in a row which open the circuit (default: {CIRCUIT_FAILURE_THRESHOLD})
+        reset_timeout {float} -- Seconds the circuit stays open (default: {CIRCUIT_RESET_TIMEOUT})
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+            _breakers[host] = breaker
+        return breaker
+
+
+class Retrier(object):
+    def __init__(self, retry_on, attempts=RETRY_LIMIT, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        """Initialise the retrier of single requests or lectures. Failures are tried again after an exponential
+        backoff with full jitter, or after the time asked for by Retry-After, behind the circuit breaker of the host.
+
+        Arguments:
+            retry_on {tuple} -- Exception classes which are worth another try
+
+        Keyword Arguments:
+            attempts {int} -- Maximum number of tries (default: {RETRY_LIMIT})
+            base_delay {float} -- Seconds of backoff after the first failure, doubled after each one (default: {RETRY_BASE_DELAY})
+            max_delay {float} -- Maximum seconds of backoff (default: {RETRY_MAX_DELAY})
+            failure_threshold {int} -- Failures in a row which open the circuit of a host (default: {CIRCUIT_FAILURE_THRESHOLD})
+            reset_timeout {float} -- Seconds the circuit of a host stays open (default: {CIRCUIT_RESET_TIMEOUT})
+        """
+        self.retry_on = retry_on
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_configuration(cls, configuration, retry_on):
+        """Create the retrier with the settings of the configuration
+
+        Arguments:
+            configuration {Configuration} -- Configuration object having the download settings
+            retry_on {tuple} -- Exception classes which are worth another try
+        """
+        return cls(retry_on,
+                   attempts=configuration.get_download_setting("retry_limit", RETRY_LIMIT),
+                   base_delay=configuration.get_download_setting("retry_base_delay", RETRY_BASE_DELAY),
+                   max_delay=configuration.get_download_setting("retry_max_delay", RETRY_MAX_DELAY),
+                   failure_threshold=configuration.get_download_setting("circuit_failure_threshold",
+                                                                        CIRCUIT_FAILURE_THRESHOLD),
+                   reset_timeout=configuration.get_download_setting("circuit_reset_timeout", CIRCUIT_RESET_TIMEOUT))
+
+    def get_delay(self, attempt, retry_after=None):
+        """Get the seconds to wait before the next try
+
+        Arguments:
+            attempt {int} -- Number of tries which failed so far
+
+        Keyword Arguments:
+            retry_after {float} -- Seconds asked for by the server, which are waited at least (default: {None})
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, url, function, cancelled=None):
+        """Call the function until it succeeds or the tries run out.
+        It fails when it raises one of the retried exceptions, or returns a response with a status in RETRY_STATUSES.
+        When the tries run out the last exception is raised, or the last response is returned.
+        If the circuit of the host is open, it first waits for the circuit to let it through.
+
+        Arguments:
+            url {str} -- URL requested by the function, whose host has the circuit breaker
+            function {function} -- Called without arguments to make the request
+
+        Keyword Arguments:
+            cancelled {function} -- Returns True when waiting for another try should be stopped (default: {None})
+        """
+        host = urlsplit(url).netloc
+        breaker = get_circuit_breaker(host, failure_threshold=self.failure_threshold,
+                                      reset_timeout=self.reset_timeout)
+        trial = self._wait_for_circuit(breaker, cancelled)
+        try:
+            return self._call(url, function, breaker, trial, cancelled)
+        finally:
+            # Clears the trial if no success or failure was recorded for it
+            breaker.release(trial)
+
+    def _wait_for_circuit(self, breaker, cancelled=None):
+        """Wait until the circuit of the host lets a call through. It waits at most for the circuit
+        to be tried as many times as the tries of a call, and then raises CircuitOpenError.
+        Returns whether the call is the trial of a half open circuit.
+
+        Arguments:
+            breaker {CircuitBreaker} -- The circuit breaker of the host
+
+        Keyword Arguments:
+            cancelled {function} -- Returns True when waiting should be stopped (default: {None})
+        """
+        end_time = time.time() + self.attempts * breaker.reset_timeout
+        while True:
+            delay, trial = breaker.allow()
+            if delay <= 0:
+                return trial
+            if time.time() + delay > end_time:
+                raise CircuitOpenError("{host} is still failing after waiting {timeout:.0f}s".format(
+                    host=breaker.host, timeout=self.attempts * breaker.reset_timeout))
+            logger.debug("Circuit of %s is open, waiting %.1fs", breaker.host, delay)
+            if not _sleep(delay, cancelled):
+                raise CircuitOpenError("Cancelled while waiting for the circuit of " + breaker.host)
+
+    def _call(self, url, function, breaker, trial, cancelled=None):
+        """Call the function until it succeeds or the tries run out, recording the outcome in the circuit breaker
+
+        Arguments:
+            url {str} -- URL requested by the function
+            function {function} -- Called without arguments to make the request
+            breaker {CircuitBreaker} -- The circuit breaker of the host
+            trial {bool} -- Whether the call is the trial of a half open circuit
+
+        Keyword Arguments:
+            cancelled {function} -- Returns True when waiting for another try should be stopped (default: {None})
+        """
+        attempt = 0
+        while True:
+            attempt = attempt + 1
+            error = None
+            response = None
+            try:
+                result = function()
+            except self.retry_on as exception:
+                error = exception
+                response = getattr(exception, "response", None)
+                if response is not None and response.status_code not in RETRY_STATUSES:
+                    # The host answered, with an error which won't go away by trying again
+                    breaker.record_success()
+                    raise
+            else:
+                if getattr(result, "status_code", None) not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return result
+                response = result
+
+            retry_after = _get_retry_after(response)
+            reason = str(error) if error is not None else "status {status}".format(status=response.status_code)
+            stop = cancelled is not None and cancelled()
+            if attempt >= self.attempts or (retry_after is not None and retry_after > RETRY_AFTER_LIMIT) or stop:
+                logger.error("Giving up on %s after %d tries: %s", url, attempt, reason)
+                if not stop:
+                    breaker.record_failure(trial=trial)
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self.get_delay(attempt, retry_after)
+            logger.debug("Try %d of %s failed (%s), trying again in %.1fs", attempt, url, reason, delay)
+            if not _sleep(delay, cancelled):
+                if error is not None:
+                    raise error
+                return response
+
+
+def _sleep(delay, cancelled=None):
+    """Wait for the delay, in short steps so that cancelling isn't held up. Returns False if cancelled
+
+    Arguments:
+        delay {float} -- Seconds to wait
+
+    Keyword Arguments:
+        cancelled {function} -- Returns True when waiting should be stopped (default: {None})
+    """
+    end_time = time.time() + delay
+    while True:
+        remaining = end_time - time.time()
+        if remaining <= 0:
+            return True
+        if cancelled is not None and cancelled():
+            return False
+        time.sleep(min(remaining, 0.2))
+
+
+class FailureReport(object):
+    def __init__(self):
+        """Initialise the report of the lectures which failed after all their tries
+        """
+        self.lock = threading.Lock()
+        self.failures = []
+
+    def add(self, name, stage, error):
+        """Add a failed lecture to the report
+
+        Arguments:
+            name {str} -- Description of the lecture
+            stage {str} -- What was being done: 'claim', 'resolve' or 'download'
+            error {Exception} -- The error of the last try
+        """
+        with self.lock:
+            self.failures.append((name, stage, str(error) or type(error).__name__))
+
+    def __len__(self):
+        with self.lock:
+            return len(self.failures)
+
+    def __str__(self):
+        with self.lock:
+            return "\n".join("{name} ({stage}): {error}".format(name=name, stage=stage, error=error)
+                             for name, stage, error in self.failures)
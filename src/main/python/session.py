@@ -1,15 +1,11 @@
 import json
 import logging
-from pathlib import Path
 
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
-from PyQt5.QtWidgets import QLineEdit
 
-import utils
-from constants import (CRITICAL, DOWNLOAD_COURSES_LABEL, INFORMATION, OTHER,
-                       PROBLEM, RETRIEVE_COURSES_LABEL, RETRY_LIMIT, VIDEO,
-                       WARNING, SESSION_LOG)
-from edx_downloader import EdXDownloader
+from constants import SESSION_LOG
+from jobs import Job
+from orchestrator import DownloadOrchestrator, create_downloader
 
 logging.basicConfig(level=logging.DEBUG, filename=SESSION_LOG, filemode="w")
 logger = logging.getLogger(__name__)
@@ -18,18 +14,17 @@ logger.setLevel(logging.DEBUG)
 
 class Session(QObject):
 
-    login_successful = pyqtSignal(bool)
-    courses_retrieved = pyqtSignal(bool)
-    loading_screen = pyqtSignal(bool)
-    clear_course_list = pyqtSignal()
-    clear_course_structure = pyqtSignal()
+    login_successful = pyqtSignal(bool, list)
+    course_retrieved = pyqtSignal(object)
+    courses_retrieved = pyqtSignal(list, list)
     courses_downloaded = pyqtSignal(bool)
     download_progress = pyqtSignal(float)
-    destination_required = pyqtSignal(str, str, str)
-    course_selection_required = pyqtSignal(str, str, str)
+    download_stats = pyqtSignal(object)
+    lectures_changed = pyqtSignal(dict)
 
     def __init__(self, configuration, application_context, website_name):
-        """Initialise the session for downloading
+        """Initialise the session for downloading. It adapts the downloader and the download orchestrator,
+        which don't depend on Qt, to the signals and slots used by the window.
         
         Arguments:
             configuration {Configuration} -- Configuration object having data about website
@@ -41,9 +36,11 @@ class Session(QObject):
         self.application_context = application_context
         self.website = website_name
         self.set_downloader(website_name)
-        self.data = {"courses": {}, "selected_courses": set(), "lectures": {}}
-        self.cancelled = False
+        self.data = {"courses": {}, "selected_courses": [], "lectures": {}}
+        self.job = None
+        self.orchestrator = None
 
+    @pyqtSlot(str)
     def change_website(self, website_name):
         """Change the website downloader
         
@@ -55,15 +52,15 @@ class Session(QObject):
 
     def set_downloader(self, website_name):
         """Set the appropriate downloader class for the website name.
-        Currently only edX is supported
+        Currently only edX is supported.
         
         Arguments:
             website_name {str} -- Name of the website
         """
-        if website_name == "edX":
-            self.downloader = EdXDownloader(self.configuration)
-        else:
-            self.downloader = None
+        if getattr(self, "downloader", None) is not None:
+            self.downloader.close()
+
+        self.downloader = create_downloader(self.configuration, website_name)
 
     def set_credentials(self, username, password):
         """Store the username and password for the session
@@ -75,138 +72,109 @@ class Session(QObject):
         self.username = username
         self.password = password
 
-    @pyqtSlot('QListView', 'QPushButton', 'QLineEdit')
-    def action_button_clicked(self, course_list_widget, action_button, root_folder_input):
-        """Callback when the Retrieve courses or Download courses button is clicked
-        
-        Arguments:
-            course_list_widget {CourseListView} -- Course list object
-            action_button {QButton} -- Reference to the button clicked
-            root_folder_input {QLineEdit} -- Textfield containing the location to where download files
-        """
-        if(str(action_button.text()) == RETRIEVE_COURSES_LABEL and len(course_list_widget.selected_courses) > 0):
-            action_button.setText(DOWNLOAD_COURSES_LABEL)
-            self.retrieve_course_details(course_list_widget)
-        elif(str(action_button.text()) == RETRIEVE_COURSES_LABEL):
-            self.course_selection_required.emit('Select course(s)',
-                                                'Atleast one course has to be selected before trying to retrieve.',
-                                                CRITICAL)
-        elif(str(action_button.text()) == DOWNLOAD_COURSES_LABEL and root_folder_input.text() != ""):
-            action_button.setDisabled(True)
-            self.download_courses(course_list_widget, root_folder_input.text())
-        elif(str(action_button.text()) == DOWNLOAD_COURSES_LABEL):
-            self.destination_required.emit(
-                'Select a root folder', 'Destination folder required before downloading.', CRITICAL)
-
-    @pyqtSlot('QLineEdit', 'QLineEdit')
+    @pyqtSlot(str, str)
     def login(self, username, password):
-        """Callback when the Login button is pressed
-        Show the loading screen, login to the website and close the loading screen
+        """Login to the website. Runs on the session thread, queued from the Login button.
+        The result is emitted with the list of courses of the user, unless the login was cancelled.
 
         Arguments:
-            username {QLineEdit} -- Input field for username
-            password {QLineEdit} -- Input field for password
+            username {str} -- The username of the user
+            password {str} -- The password of the user
         """
-        self.clear_course_list.emit()
-        self.loading_screen.emit(True)
-        self.set_credentials(username.text(), password.text())
+        job = self._start_job("login")
+        self.set_credentials(username, password)
         successful = self.downloader.login(self.username, self.password)
-        self.loading_screen.emit(False)
-        self.login_successful.emit(successful)
+        if job.is_cancelled():
+            logger.debug("%s cancelled", str(job))
+            return
+        courses = list(self.downloader.courses.values()) if successful else []
+        self.login_successful.emit(successful, courses)
+
+    @pyqtSlot(list)
+    def retrieve_course_details(self, course_keys):
+        """Get the details for all selected courses. Runs on the session thread, queued from the Retrieve button.
+        Each course is emitted as soon as its outline is retrieved, so the lecture tree fills up progressively.
+        At the end the retrieved courses and the results of the courses which failed are emitted,
+        unless retrieving was cancelled.
+        
+        Arguments:
+            course_keys {list} -- Unique IDs/keys of the selected courses
+        """
+        job = self._start_job("retrieve")
+        self.data["selected_courses"] = course_keys
+        results = self.downloader.get_course_lectures(
+            course_keys, cancelled=job.is_cancelled,
+            on_course_retrieved=lambda result: self._course_retrieved(job, result))
+        if job.is_cancelled():
+            logger.debug("%s cancelled", str(job))
+            return
+        courses = [self.downloader.courses[course_key] for course_key, result in results.items() if result.successful]
+        failures = [result for result in results.values() if not result.successful]
+        self.courses_retrieved.emit(courses, failures)
+
+    def _course_retrieved(self, job, result):
+        """Emit the course whose outline was retrieved, unless retrieving was cancelled
+        
+        Arguments:
+            job {Job} -- The retrieve job
+            result {CourseResult} -- Result of retrieving the outline of the course
+        """
+        if result.successful and not job.is_cancelled():
+            self.course_retrieved.emit(self.downloader.courses[result.course_id])
 
-    def retrieve_course_details(self, course_list_widget):
-        """Get the details for all selected courses.
-        Show the loading screen, get all details, close the loading screen.
+    @property
+    def cancelled(self):
+        """Whether the current job was cancelled
+        """
+        return self.job is not None and self.job.is_cancelled()
+
+    def _start_job(self, name):
+        """Start a new job, which replaces the current one
         
         Arguments:
-            course_list_widget {CourseListView} -- The course list view widget
+            name {str} -- Name of the job
         """
-        self.clear_course_structure.emit()
-        self.loading_screen.emit(True)
-        self.data["selected_courses"] = course_list_widget.selected_courses
-        successful = self.downloader.get_course_lectures(
-            self.data["selected_courses"])
-        self.loading_screen.emit(False)
-        self.courses_retrieved.emit(successful)
+        self.job = Job(name)
+        logger.debug("Starting %s", str(self.job))
+        return self.job
 
     def cancel_pressed(self):
-        """Set the cancelled flag to True when the Cancel button is pressed
+        """Cancel the current job when the Cancel button is pressed.
+        It's called directly from the GUI thread, so it only sets flags which the job checks.
         """
-        self.cancelled = True
-
-    def download_courses(self, course_list_widget, root_folder):
+        job = self.job
+        if job is not None:
+            job.cancel()
+        orchestrator = self.orchestrator
+        if orchestrator is not None:
+            orchestrator.cancel()
+
+    @pyqtSlot(list, str)
+    def download_courses(self, course_keys, root_folder):
         """Downloaded the lecture videos of all selected courses
-        If any error occurs tries again until RETRY_LIMIT is reached.
+        Runs on the session thread, queued from the Download button.
+        The downloads are done by the orchestrator, whose callbacks are forwarded as signals.
         Arguments:
-            course_list_widget {CourseListView} -- The course list view widget
+            course_keys {list} -- Unique IDs/keys of the selected courses
             root_folder {str} -- The destination folder selected for the downloads
         """
-        downloaded = False
-        try_count = 0
-        download_count = 0
-        self.cancelled = False
-        self.data["selected_courses"] = course_list_widget.selected_courses
-
-        while ((not downloaded) and try_count < RETRY_LIMIT):
-            try:
-                for course_id in self.data["selected_courses"]:
-                    course_outline = self.downloader.courses[course_id].course_outline
-                    for section in course_outline:
-                        logger.debug("\tSection name: %s", section)
-                        for subsection in course_outline[section]:
-                            download_count = self._download_lecture(
-                                course_outline, section, subsection, course_id, root_folder, download_count)
-
-                downloaded = True
-            except utils.BreakLoop:
-                self.courses_downloaded.emit(False)
-                return
-            except Exception as error:
-                logger.error(error)
-                try_count = try_count + 1
+        job = self._start_job("download")
+        self.data["selected_courses"] = course_keys
+        self.orchestrator = DownloadOrchestrator(
+            self.configuration, self.downloader, job=job,
+            on_progress=self._report_progress,
+            on_lectures_changed=self.lectures_changed.emit)
+        try:
+            downloaded = self.orchestrator.run(course_keys, root_folder)
+        finally:
+            self.orchestrator = None
         self.courses_downloaded.emit(downloaded)
 
-    def _download_lecture(self, course_outline, section, subsection, course_id, root_folder, download_count):
-        """Download the lecture video
+    def _report_progress(self, stats):
+        """Report the download progress. Called by the orchestrator at a limited rate.
         
         Arguments:
-            course_outline {dict} -- The course structure having sections, subsections and lectures (default: {OrderedDict()})
-            section {str} -- Section of the lecture
-            subsection {str} -- Subsection of the lecture
-            course_id {str} -- Course ID of the lecture
-            root_folder {str} -- The destination folder selected for the downloads
-            download_count {int} -- Download count to track progress
+            stats {ProgressStats} -- Snapshot of the download progress
         """
-        for index, lecture_url in enumerate(course_outline[section][subsection]):
-            path = Path(root_folder, self.downloader.courses[course_id].name,
-                        section, subsection)
-            lecture_title = (str(index + 1).zfill(len(str(len(course_outline[section][subsection])))) +
-                             "-" + course_outline[section][subsection][lecture_url])
-            lecture = self.downloader.get_lecture_details(
-                lecture_title, lecture_url)
-            download_count = download_count + 1
-
-            if lecture is None:
-                continue
-            downloaded = utils.is_downloaded(
-                course_id, section, subsection, self.downloader.courses[course_id], lecture, root_folder)
-            self.downloader.set_lecture_downloaded(lecture_url, downloaded=downloaded)
-            
-            if lecture.media_type == VIDEO and (not downloaded):
-                lecture = self.downloader.set_lecture_path(lecture_url, path)
-                successful = utils.download_lecture(lecture)
-                if (successful):
-                    lecture = self.downloader.set_lecture_downloaded(lecture_url)
-                    utils.save_downloads(
-                        course_id, section, subsection, self.downloader.courses[course_id], lecture, root_folder)
-
-                    self.download_progress.emit(
-                        download_count/len(self.downloader.lectures))
-            else:
-                self.download_progress.emit(
-                    download_count/len(self.downloader.lectures))
-
-            if self.cancelled:
-                raise utils.BreakLoop
-
-        return download_count
+        self.download_progress.emit(stats.fraction)
+        self.download_stats.emit(stats)
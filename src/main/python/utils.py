@@ -2,32 +2,60 @@ import json
 import logging, sys
 import re
 import subprocess, os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
 import shlex
 import youtube_dl
 
-import requests
-from PyQt5.QtWidgets import QFrame
-
-from constants import WINDOWS_EXCLUDED_CHARACTERS, DOWNLOAD_DATA
+from constants import (WINDOWS_EXCLUDED_CHARACTERS, DOWNLOAD_CHUNK_SIZE,
+                       DOWNLOAD_SEGMENTS, PART_EXTENSION, PART_METADATA_EXTENSION,
+                       SEGMENT_THRESHOLD, SQLITE_BACKEND, STATE_BACKEND)
+import http_client
+from download_catalog import DownloadCatalog
+from download_state import DownloadState
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-class BreakLoop(Exception):
-    """Dummy exception to break out of nested loops
+_download_states = {}
+_download_states_lock = threading.Lock()
+_redirects = {}
+_redirects_lock = threading.Lock()
+
+class DownloadError(Exception):
+    """Raised when a lecture couldn't be downloaded, so that it can be retried
+    """
+    pass
+
+class FileChangedError(DownloadError):
+    """Raised when the file changed on the server while resuming its download
     """
     pass
 
-def is_downloadable(url):
+def get_file_headers(url):
+    """Get the response headers of the url without downloading its content
+    
+    Arguments:
+        url {str} -- URL of the file
+    """
+    req = http_client.get_client().head(url, allow_redirects=True)
+    return req.headers
+
+def is_downloadable(url, headers=None):
     """Does the url contain a downloadable resource
     
     Arguments:
         url {str} -- URL to check whether it can be downloaded
+    
+    Keyword Arguments:
+        headers {dict} -- Headers already retrieved for the url, to avoid another request (default: {None})
     """
-    req = requests.head(url, allow_redirects=True)
-    headers = req.headers
-    content_type = headers.get('content-type')
+    if headers is None:
+        headers = get_file_headers(url)
+    content_type = headers.get('content-type', '')
     
     if 'text' in content_type.lower():
         return False
@@ -35,26 +63,409 @@ def is_downloadable(url):
         return False
     return True
 
-def download_file(url, path, title):
+def _read_part_metadata(metadata_path):
+    """Read the metadata saved alongside a partially downloaded file
+    
+    Arguments:
+        metadata_path {Path} -- Path to the metadata file
+    """
+    if not metadata_path.exists():
+        return None
+    try:
+        with metadata_path.open() as file:
+            return json.load(file)
+    except ValueError as error:
+        logger.error("Ignoring corrupt part metadata %s: %s", str(metadata_path), error)
+        return None
+
+def _write_part_metadata(metadata_path, metadata):
+    """Save the metadata needed to resume a partially downloaded file
+    
+    Arguments:
+        metadata_path {Path} -- Path to the metadata file
+        metadata {dict} -- Expected size, ETag and Last-Modified of the file
+    """
+    with metadata_path.open(mode="w") as file:
+        json.dump(metadata, file, indent=4)
+
+def _get_content_range(content_range):
+    """Get the first byte position and the total size from a Content-Range header like 'bytes 100-999/1000'.
+    The total size is None if the server doesn't know it.
+    
+    Arguments:
+        content_range {str} -- Value of the Content-Range header
+    """
+    match = re.match(r'bytes\s+(\d+)-\d+/(\d+|\*)', content_range or '')
+    if match is None:
+        return None, None
+    return int(match.group(1)), (int(match.group(2)) if match.group(2) != "*" else None)
+
+def _get_redirected_url(url):
+    """Get the URL to which the url was redirected earlier, to avoid the extra round trips.
+    Redirects of a whole host are used for every file on that host.
+    
+    Arguments:
+        url {str} -- URL of the file
+    """
+    parts = urlsplit(url)
+    with _redirects_lock:
+        if url in _redirects:
+            return _redirects[url]
+        host = _redirects.get((parts.scheme, parts.netloc))
+    if host is None:
+        return url
+    return urlunsplit(host + (parts.path, parts.query, parts.fragment))
+
+def _remember_redirect(url, response):
+    """Cache the target of the redirects followed by the response.
+    If only the host changed, the redirect is cached for the whole host.
+    
+    Arguments:
+        url {str} -- URL which was requested
+        response {requests.Response} -- The response after following redirects
+    """
+    if not response.history:
+        return
+    original = urlsplit(url)
+    final = urlsplit(response.url)
+    with _redirects_lock:
+        if (original.path, original.query) == (final.path, final.query):
+            _redirects[(original.scheme, original.netloc)] = (final.scheme, final.netloc)
+        else:
+            _redirects[url] = response.url
+
+def _forget_redirect(url):
+    """Remove the cached redirect of the url, after it stopped working
+    
+    Arguments:
+        url {str} -- URL of the file
+    """
+    parts = urlsplit(url)
+    with _redirects_lock:
+        _redirects.pop(url, None)
+        _redirects.pop((parts.scheme, parts.netloc), None)
+
+def _request_file(url, headers):
+    """Make a streaming GET request for the file, going straight to the cached redirect target if there is one
+    
+    Arguments:
+        url {str} -- URL of the file
+        headers {dict} -- Headers of the request
+    """
+    target = _get_redirected_url(url)
+    req = http_client.get_client().get(target, headers=headers, allow_redirects=True, stream=True)
+    if target != url and req.status_code >= 400:
+        logger.debug("Cached redirect of %s failed with %d, requesting it again", url, req.status_code)
+        req.close()
+        _forget_redirect(url)
+        req = http_client.get_client().get(url, headers=headers, allow_redirects=True, stream=True)
+    _remember_redirect(url, req)
+    return req
+
+def _new_part_metadata(url, req):
+    """Get the metadata of a new part file from the response headers of the file
+    
+    Arguments:
+        url {str} -- URL of the file
+        req {requests.Response} -- Response of the file starting from its first byte
+    """
+    if req.status_code == 206:
+        _, size = _get_content_range(req.headers.get("content-range"))
+    elif "content-encoding" in req.headers:
+        size = None
+    else:
+        size = int(req.headers.get("content-length", 0)) or None
+
+    return {
+        "url": url,
+        "size": size,
+        "etag": req.headers.get("etag"),
+        "last_modified": req.headers.get("last-modified")
+    }
+
+class _ProgressCounter(object):
+    def __init__(self, progress):
+        """Initialise the counter which adds up the bytes written by all connections of a download
+        
+        Arguments:
+            progress {function} -- Called with the downloaded bytes and total bytes, or None
+        """
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.downloaded = 0
+        self.total = None
+
+    def reset(self, downloaded, total):
+        """Start counting from the bytes already in the part file
+        
+        Arguments:
+            downloaded {int} -- Number of bytes already downloaded
+            total {int} -- Size of the file in bytes, or None if it's unknown
+        """
+        with self.lock:
+            self.downloaded = downloaded
+            self.total = total
+            if self.progress is not None:
+                self.progress(downloaded, total)
+
+    def add(self, count):
+        """Count the bytes written
+        
+        Arguments:
+            count {int} -- Number of bytes written
+        """
+        if self.progress is None:
+            return
+        # Reported with the lock held, so that the counts arrive in order
+        with self.lock:
+            self.downloaded = self.downloaded + count
+            self.progress(self.downloaded, self.total)
+
+def _split_ranges(size, segments):
+    """Split a file of the given size into byte ranges of nearly equal length
+    
+    Arguments:
+        size {int} -- Size of the file in bytes
+        segments {int} -- Number of ranges
+    """
+    segment_size = -(-size // segments)
+    return [[start, min(start + segment_size, size) - 1, False]
+            for start in range(0, size, segment_size)]
+
+def _write_stream(req, part_path, mode, chunk_size, cancelled, counter):
+    """Write the whole response into the part file
+    
+    Arguments:
+        req {requests.Response} -- The streaming response
+        part_path {Path} -- Path of the part file
+        mode {str} -- 'wb' to start a new part file, 'ab' to continue one
+        chunk_size {int} -- Number of bytes read from the response at a time
+        cancelled {function} -- Returns True when the download should be stopped
+        counter {_ProgressCounter} -- Counter of the bytes written
+    """
+    with part_path.open(mode) as file:
+        for chunk in req.iter_content(chunk_size=chunk_size):
+            file.write(chunk)
+            counter.add(len(chunk))
+            if cancelled is not None and cancelled():
+                logger.debug("Download of %s cancelled, keeping the part file", str(part_path))
+                return False
+    return True
+
+def _write_segment(req, part_path, start, end, chunk_size, cancelled, counter):
+    """Write the byte range from the response at its offset in the part file.
+    Only the bytes of the range are read, even if the response has more.
+    
+    Arguments:
+        req {requests.Response} -- The streaming response starting at the first byte of the range
+        part_path {Path} -- Path of the preallocated part file
+        start {int} -- First byte of the range
+        end {int} -- Last byte of the range (inclusive)
+        chunk_size {int} -- Number of bytes read from the response at a time
+        cancelled {function} -- Returns True when the download should be stopped
+        counter {_ProgressCounter} -- Counter of the bytes written by all segments
+    """
+    remaining = end - start + 1
+    with part_path.open("r+b") as file:
+        file.seek(start)
+        for chunk in req.iter_content(chunk_size=chunk_size):
+            chunk = chunk[:remaining]
+            file.write(chunk)
+            counter.add(len(chunk))
+            remaining = remaining - len(chunk)
+            if remaining == 0:
+                break
+            if cancelled is not None and cancelled():
+                return False
+
+    if remaining != 0:
+        raise DownloadError("Segment {start}-{end} of {path} is missing {remaining} bytes".format(
+            start=start, end=end, path=str(part_path), remaining=remaining))
+    return True
+
+def _download_segment(url, part_path, start, end, validator, chunk_size, cancelled, counter):
+    """Download one byte range of the file and write it at its offset in the part file.
+    The segment is verified to be the requested range and to have the expected length.
+    
+    Arguments:
+        url {str} -- URL to the file
+        part_path {Path} -- Path of the preallocated part file
+        start {int} -- First byte of the range
+        end {int} -- Last byte of the range (inclusive)
+        validator {str} -- ETag or Last-Modified of the file, so that a changed file isn't mixed in
+        chunk_size {int} -- Number of bytes read from the response at a time
+        cancelled {function} -- Returns True when the download should be stopped
+        counter {_ProgressCounter} -- Counter of the bytes written by all segments
+    """
+    headers = {"Range": "bytes={start}-{end}".format(start=start, end=end)}
+    if validator:
+        headers["If-Range"] = validator
+
+    with _request_file(url, headers) as req:
+        req.raise_for_status()
+        if req.status_code == 200:
+            raise FileChangedError("{url} changed on the server".format(url=url))
+        if _get_content_range(req.headers.get("content-range"))[0] != start:
+            raise DownloadError("Server didn't return bytes {start}-{end} of {url}".format(
+                start=start, end=end, url=url))
+        return _write_segment(req, part_path, start, end, chunk_size, cancelled, counter)
+
+def _download_segmented(url, part_path, metadata_path, metadata, segments, chunk_size, cancelled, counter,
+                        first_response=None):
+    """Download the file as several byte ranges in parallel, into a preallocated part file.
+    Finished segments are recorded in the part metadata, so only the unfinished ones are fetched again.
+    
+    Arguments:
+        url {str} -- URL to the file
+        part_path {Path} -- Path of the part file
+        metadata_path {Path} -- Path of the part metadata file
+        metadata {dict} -- Metadata of the part file having the size, ETag and Last-Modified of the file
+        segments {int} -- Number of byte ranges to split the file into
+        chunk_size {int} -- Number of bytes read from the response at a time
+        cancelled {function} -- Returns True when the download should be stopped
+        counter {_ProgressCounter} -- Counter of the bytes written by all segments
+    
+    Keyword Arguments:
+        first_response {requests.Response} -- Response starting at the first byte, used for the first segment (default: {None})
+    """
+    if first_response is not None:
+        metadata["segments"] = _split_ranges(metadata["size"], segments)
+        with part_path.open("wb") as file:
+            file.truncate(metadata["size"])
+        _write_part_metadata(metadata_path, metadata)
+
+    counter.reset(sum(end - start + 1 for start, end, done in metadata["segments"] if done), metadata["size"])
+    pending = [index for index, segment in enumerate(metadata["segments"]) if not segment[2]]
+    logger.debug("Downloading %d of %d segments of %s", len(pending), len(metadata["segments"]), str(part_path))
+    if not pending:
+        return True
+
+    complete = True
+    validator = metadata.get("etag") or metadata.get("last_modified")
+    with ThreadPoolExecutor(len(pending)) as pool:
+        futures = {}
+        for index in pending:
+            start, end, _ = metadata["segments"][index]
+            if first_response is not None and start == 0:
+                future = pool.submit(_write_segment, first_response, part_path, start, end, chunk_size,
+                                     cancelled, counter)
+            else:
+                future = pool.submit(_download_segment, url, part_path, start, end, validator, chunk_size,
+                                     cancelled, counter)
+            futures[future] = index
+
+        for future in as_completed(futures):
+            if future.result():
+                metadata["segments"][futures[future]][2] = True
+                _write_part_metadata(metadata_path, metadata)
+            else:
+                complete = False
+
+    return complete
+
+def download_file(url, path, title, chunk_size=DOWNLOAD_CHUNK_SIZE, segments=DOWNLOAD_SEGMENTS,
+                  segment_threshold=SEGMENT_THRESHOLD, cancelled=None, progress=None):
     """Download the file
+    The response is streamed to a part file in chunks, and renamed once complete,
+    so that memory usage doesn't grow with the size of the file.
+    There is no separate HEAD request: the content type is checked on the headers of the GET itself.
+    Files larger than the segment threshold are downloaded as several byte ranges in parallel,
+    if the server accepts Range requests. All requests go through the pooled media client.
+    If the download fails or is cancelled, the part file is kept along with its expected size,
+    ETag and Last-Modified, so that the next try continues from where it stopped.
+    Returns False if it was cancelled or isn't a downloadable file. Errors are raised,
+    so that the caller can try again.
     
     Arguments:
         url {str} -- URL to the file
         path {Path} -- File path to which it'll be downloaded 
         title {str} -- Name of the file
+    
+    Keyword Arguments:
+        chunk_size {int} -- Number of bytes read from the response at a time (default: {DOWNLOAD_CHUNK_SIZE})
+        segments {int} -- Number of parallel connections used for large files (default: {DOWNLOAD_SEGMENTS})
+        segment_threshold {int} -- Minimum size in bytes of a file to be downloaded in segments (default: {SEGMENT_THRESHOLD})
+        cancelled {function} -- Returns True when the download should be stopped (default: {None})
+        progress {function} -- Called with the downloaded bytes and total bytes, if known (default: {None})
     """
-    if is_downloadable(url):
-        try:
-            req = requests.get(url, allow_redirects=True)
-            extension = url.rsplit(".", maxsplit=1)[-1] if "." in url else "mp4"
-            with open(str(Path(path, title + "." + extension)), "wb") as file:
-                file.write(req.content)
-            return True
-        except Exception as error:
-            logger.error(error)
+    extension = url.rsplit(".", maxsplit=1)[-1] if "." in url else "mp4"
+    file_path = Path(path, title + "." + extension)
+    part_path = Path(path, title + "." + extension + PART_EXTENSION)
+    metadata_path = Path(path, title + "." + extension + PART_EXTENSION + PART_METADATA_EXTENSION)
+    start_time = time.time()
+    counter = _ProgressCounter(progress)
+    try:
+        metadata = _read_part_metadata(metadata_path)
+        offset = part_path.stat().st_size if (metadata is not None and part_path.exists()) else 0
+        segmented = metadata is not None and "segments" in metadata and part_path.exists()
+
+        if segmented:
+            complete = _download_segmented(url, part_path, metadata_path, metadata, segments, chunk_size,
+                                           cancelled, counter)
+        elif offset > 0 and offset == metadata.get("size"):
+            logger.debug("%s was already fully downloaded", str(part_path))
+            counter.reset(offset, offset)
+            complete = True
+        else:
+            # Asking for a range tells whether the server supports them, without another request
+            headers = {"Range": "bytes={offset}-".format(offset=offset)}
+            validator = metadata.get("etag") or metadata.get("last_modified") if offset > 0 else None
+            if validator:
+                headers["If-Range"] = validator
+
+            with _request_file(url, headers) as req:
+                req.raise_for_status()
+                if not is_downloadable(url, headers=req.headers):
+                    logger.debug("%s is not a downloadable file", url)
+                    return False
+
+                range_start, _ = _get_content_range(req.headers.get("content-range"))
+                resumed = offset > 0 and req.status_code == 206 and range_start == offset
+                if resumed:
+                    logger.debug("Resuming %s from byte %d", str(file_path), offset)
+                elif req.status_code == 206 and range_start != 0:
+                    raise DownloadError("Server returned an unexpected range of {url}".format(url=url))
+                else:
+                    # Either a new download, or the file changed on the server, so start over
+                    metadata = _new_part_metadata(url, req)
+                    _write_part_metadata(metadata_path, metadata)
+
+                segmented = (not resumed and segments > 1 and metadata["size"] is not None
+                             and metadata["size"] >= segment_threshold
+                             and "content-encoding" not in req.headers
+                             and (req.status_code == 206 or req.headers.get("accept-ranges", "").lower() == "bytes"))
+                if segmented:
+                    complete = _download_segmented(url, part_path, metadata_path, metadata, segments,
+                                                   chunk_size, cancelled, counter, first_response=req)
+                else:
+                    counter.reset(offset if resumed else 0, metadata["size"])
+                    complete = _write_stream(req, part_path, "ab" if resumed else "wb", chunk_size,
+                                             cancelled, counter)
+
+        if not complete:
             return False
-    else:
-        return False
+
+        if metadata.get("size") is not None and part_path.stat().st_size != metadata["size"]:
+            raise DownloadError("Incomplete download of {path}: {received} of {size} bytes".format(
+                path=str(file_path), received=part_path.stat().st_size, size=metadata["size"]))
+
+        os.replace(str(part_path), str(file_path))
+        metadata_path.unlink()
+        elapsed = max(time.time() - start_time, 1e-6)
+        logger.info("Downloaded %s: %d bytes in %.2fs (%.2f MB/s, %s)", str(file_path),
+                    file_path.stat().st_size, elapsed, file_path.stat().st_size / elapsed / 1024 / 1024,
+                    "{segments} segments".format(segments=len(metadata["segments"])) if segmented
+                    else "single stream")
+        return True
+    except FileChangedError as error:
+        logger.error("%s, discarding the part file", error)
+        for stale_path in (part_path, metadata_path):
+            if stale_path.exists():
+                stale_path.unlink()
+        raise
+    except Exception as error:
+        logger.error(error)
+        raise
 
 def download_from_youtube(url, path, title):
     """Download video from youtube using youtube-dl
@@ -74,22 +485,34 @@ def download_from_youtube(url, path, title):
     return True
 
 
-def download_lecture(lecture):
+def download_lecture(lecture, chunk_size=DOWNLOAD_CHUNK_SIZE, segments=DOWNLOAD_SEGMENTS,
+                     segment_threshold=SEGMENT_THRESHOLD, cancelled=None, youtube=None, progress=None):
     """Util method to download the lecture.
     Checks whether its a file URL or if its YouTube link and calls appropriate function
     
     Arguments:
         lecture {Lecture} -- The Lecture object having required details
+    
+    Keyword Arguments:
+        chunk_size {int} -- Number of bytes written to disk at a time (default: {DOWNLOAD_CHUNK_SIZE})
+        segments {int} -- Number of parallel connections used for large files (default: {DOWNLOAD_SEGMENTS})
+        segment_threshold {int} -- Minimum size in bytes of a file to be downloaded in segments (default: {SEGMENT_THRESHOLD})
+        cancelled {function} -- Returns True when the download should be stopped (default: {None})
+        youtube {YoutubeDownloader} -- Manager used for YouTube videos, instead of a new YoutubeDL for each (default: {None})
+        progress {function} -- Called with the downloaded bytes and total bytes, if known (default: {None})
     """
     url = lecture.download_url
     path = Path(lecture.path.parts[0], *[re.sub('[' + WINDOWS_EXCLUDED_CHARACTERS + ']', '', part) for part in lecture.path.parts[1:]])
     title = re.sub('[' + WINDOWS_EXCLUDED_CHARACTERS + ']', '', lecture.title)
     logger.debug("Saving %s to %s", title, path)
     ensure_directory_exists(path)
-    if lecture.from_youtube:
+    if lecture.from_youtube and youtube is not None:
+        successful = youtube.download(url, path, title, progress=progress, cancelled=cancelled)
+    elif lecture.from_youtube:
         successful = download_from_youtube(url, path, title)
     else:
-        successful = download_file(url, path, title)
+        successful = download_file(url, path, title, chunk_size=chunk_size, segments=segments,
+                                   segment_threshold=segment_threshold, cancelled=cancelled, progress=progress)
 
     return successful
 
@@ -100,11 +523,40 @@ def ensure_directory_exists(path):
         path {str} -- Path to be checked
     """
     if not Path(path).exists():
-        os.makedirs(str(path))
+        os.makedirs(str(path), exist_ok=True)
 
 
-def save_downloads(course_id, section, subsection, course, lecture, root_folder):
-    """Util method to save the state of the downloads in a JSON file
+def get_download_state(root_folder, backend=STATE_BACKEND):
+    """Get the download state of the root folder. It's loaded from disk only the first time.
+    
+    Arguments:
+        root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
+    """
+    key = (os.path.abspath(str(root_folder)), backend)
+    with _download_states_lock:
+        if key not in _download_states:
+            if backend == SQLITE_BACKEND:
+                _download_states[key] = DownloadCatalog(root_folder)
+            else:
+                _download_states[key] = DownloadState(root_folder)
+        return _download_states[key]
+
+def flush_downloads(root_folder, backend=STATE_BACKEND):
+    """Write any pending download state of the root folder to disk
+    
+    Arguments:
+        root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
+    """
+    get_download_state(root_folder, backend=backend).flush()
+
+def save_downloads(course_id, section, subsection, course, lecture, root_folder, backend=STATE_BACKEND):
+    """Util method to save the state of the downloads
     
     Arguments:
         course_id {str} -- Course ID of the lecture
@@ -113,32 +565,13 @@ def save_downloads(course_id, section, subsection, course, lecture, root_folder)
         course {Course} -- Selected Course object having all its details
         lecture {Lecture} -- Downloaded Lecture object having all its details
         root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
     """
-    ensure_directory_exists(root_folder)
-    if Path(root_folder, DOWNLOAD_DATA).exists():
-        with Path(root_folder, DOWNLOAD_DATA).open() as file:
-            downloads = json.load(file)
-    else:
-        downloads = {
-            course_id: {
-                "name": course.name,
-                "sections": {
-                    section : {
-                        subsection: {}
-                    }
-                }
-            }}
-    lecture_data = lecture.get_dict()
-    course_data = downloads.get(course_id, {})
-    course_data["sections"] = course_data.get("sections", {})
-    course_data["sections"][section] = course_data["sections"].get(section, {})
-    course_data["sections"][section][subsection] = course_data["sections"][section].get(subsection, {})
-    course_data["sections"][section][subsection][lecture.url] = lecture_data
-    downloads[course_id] = course_data
-    with Path(root_folder, DOWNLOAD_DATA).open(mode="w") as file:
-        json.dump(downloads, file, indent=4)
-
-def is_downloaded(course_id, section, subsection, course, lecture, root_folder):
+    get_download_state(root_folder, backend=backend).save_lecture(course_id, section, subsection, course, lecture)
+
+def is_downloaded(course_id, section, subsection, course, lecture, root_folder, backend=STATE_BACKEND):
     """util method to check if the lecture has already been downloaded
     
     Arguments:
@@ -148,20 +581,34 @@ def is_downloaded(course_id, section, subsection, course, lecture, root_folder):
         course {Course} -- Selected Course object having all its details
         lecture {Lecture} -- Downloaded Lecture object having all its details
         root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
     """
-    downloaded = False
-    path = Path(root_folder, DOWNLOAD_DATA)
-    if path.exists():
-        with path.open() as file:
-            data = json.load(file)
-        
-        if course_id in data:
-            downloaded = data[course_id]["sections"].get(section, {}) \
-                                .get(subsection, {}).get(lecture.url, {}).get("downloaded",False)
-
-
-    return downloaded
-
+    return get_download_state(root_folder, backend=backend).is_downloaded(course_id, lecture.url)
 
+def claim_lecture(course_id, lecture, root_folder, backend=STATE_BACKEND):
+    """Util method to claim the lecture for this process before downloading it, so that another process
+    sharing the root folder doesn't download it at the same time.
+    Returns False if it's already downloaded or claimed by another process.
+    
+    Arguments:
+        course_id {str} -- Course ID of the lecture
+        lecture {Lecture} -- Lecture object having all its details
+        root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
+    """
+    return get_download_state(root_folder, backend=backend).claim_lecture(course_id, lecture.url)
 
+def release_claims(root_folder, backend=STATE_BACKEND):
+    """Util method to release the lectures claimed by this process which weren't downloaded
     
+    Arguments:
+        root_folder {str} -- The destination folder selected for the downloads
+    
+    Keyword Arguments:
+        backend {str} -- Where the state is stored: JSON_BACKEND or SQLITE_BACKEND (default: {STATE_BACKEND})
+    """
+    get_download_state(root_folder, backend=backend).release_claims()
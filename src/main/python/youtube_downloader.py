@@ -0,0 +1,136 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import youtube_dl
+
+from constants import READ_TIMEOUT, YOUTUBE_FORMAT, YOUTUBE_WORKERS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class YoutubeCancelled(Exception):
+    """Raised from the progress hook to stop a YouTube download when it's cancelled
+    """
+    pass
+
+
+class YoutubeDownloader(object):
+    def __init__(self, workers=YOUTUBE_WORKERS, video_format=YOUTUBE_FORMAT, socket_timeout=READ_TIMEOUT):
+        """Initialise the manager of YouTube downloads.
+        Every worker thread keeps one configured YoutubeDL instance, instead of creating one per lecture.
+        Video information is extracted ahead of time on a pool of workers, as soon as a lecture is resolved,
+        and at most a fixed number of videos are downloaded at a time.
+
+        Keyword Arguments:
+            workers {int} -- Number of videos extracted or downloaded at a time (default: {YOUTUBE_WORKERS})
+            video_format {str} -- youtube-dl format selection, used to prefer smaller files (default: {YOUTUBE_FORMAT})
+            socket_timeout {float} -- Seconds to wait for the next bytes of a response (default: {READ_TIMEOUT})
+        """
+        self.workers = max(1, workers)
+        self.video_format = video_format
+        self.socket_timeout = socket_timeout
+        self.local = threading.local()
+        self.slots = threading.BoundedSemaphore(self.workers)
+        self.extract_pool = ThreadPoolExecutor(self.workers)
+        self.lock = threading.Lock()
+        self.extractions = {}
+
+    def _get_ydl(self):
+        """Get the YoutubeDL instance of the current thread, creating it the first time
+        """
+        ydl = getattr(self.local, "ydl", None)
+        if ydl is None:
+            ydl = youtube_dl.YoutubeDL({
+                "format": self.video_format,
+                "quiet": True,
+                "no_warnings": True,
+                "noplaylist": True,
+                "continuedl": True,
+                "socket_timeout": self.socket_timeout,
+                "logger": logger,
+                "progress_hooks": [self._progress_hook]
+            })
+            self.local.ydl = ydl
+            self.local.progress = None
+            self.local.cancelled = None
+        return ydl
+
+    def _progress_hook(self, status):
+        """Forward the progress of the current download of the thread, and stop it if cancelled
+
+        Arguments:
+            status {dict} -- Progress reported by youtube-dl
+        """
+        if self.local.cancelled is not None and self.local.cancelled():
+            raise YoutubeCancelled()
+        if self.local.progress is not None and status.get("status") in ("downloading", "finished"):
+            total = status.get("total_bytes") or status.get("total_bytes_estimate")
+            self.local.progress(status.get("downloaded_bytes") or 0, total)
+
+    def _extract(self, url):
+        """Extract the information of the video without downloading it
+
+        Arguments:
+            url {str} -- YouTube URL
+        """
+        return self._get_ydl().extract_info(url, download=False, process=False)
+
+    def prefetch(self, url):
+        """Start extracting the information of the video in the background, so it's ready when downloading
+
+        Arguments:
+            url {str} -- YouTube URL
+        """
+        with self.lock:
+            if url not in self.extractions:
+                self.extractions[url] = self.extract_pool.submit(self._extract, url)
+            return self.extractions[url]
+
+    def download(self, url, path, title, progress=None, cancelled=None):
+        """Download the video, reusing the information extracted by prefetch.
+        Blocks while the maximum number of videos are already being downloaded.
+
+        Arguments:
+            url {str} -- YouTube URL
+            path {Path} -- Folder to which it'll be downloaded
+            title {str} -- Name of the file
+
+        Keyword Arguments:
+            progress {function} -- Called with the downloaded bytes and total bytes, if known (default: {None})
+            cancelled {function} -- Returns True when the download should be stopped (default: {None})
+        """
+        try:
+            info = self.prefetch(url).result()
+        except Exception:
+            # Extract it again on the next try
+            with self.lock:
+                self.extractions.pop(url, None)
+            raise
+
+        with self.slots:
+            if cancelled is not None and cancelled():
+                return False
+            ydl = self._get_ydl()
+            ydl.params["outtmpl"] = str(Path(path, title)) + ".%(ext)s"
+            self.local.progress = progress
+            self.local.cancelled = cancelled
+            try:
+                ydl.process_ie_result(dict(info), download=True)
+            except YoutubeCancelled:
+                logger.debug("Download of %s cancelled", url)
+                return False
+            finally:
+                self.local.progress = None
+                self.local.cancelled = None
+                # The extracted format URLs are signed and expire, so a later try extracts them again
+                with self.lock:
+                    self.extractions.pop(url, None)
+        return True
+
+    def close(self):
+        """Stop the extraction workers
+        """
+        self.extract_pool.shutdown(wait=False)